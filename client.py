@@ -1,131 +1,217 @@
 # Save this as client.py
+import argparse
+import asyncio
+import os
 import socket
+import sys
 import threading
-import time
+from framing import LineFramer
+from protocol import (HAND_HEADER, HAND_FOOTER, TOP_CARD, VALID_MOVES, NO_VALID_MOVES, YOUR_TURN,
+                      PROMPTS)
+
+PORT = 5555
+
+
+class ClientState:
+    """
+    Everything the client knows about the game, updated from server messages.
+    Shared by the threaded client, the asyncio client and the bot.
+
+    Attributes:
+        my_turn (bool): Whether the server is waiting on this player.
+        waiting_for (str): The prompt being answered (e.g., COLOR), or None for a turn.
+        top_card (str): The current top card.
+        hand (list): The hand lines (e.g., " 1.RED 5").
+        valid_moves (list): The 1-indexed cards that can be played.
+        player_number (int): This player's number, once welcomed.
+        needs_render (bool): Whether the turn display is out of date.
+    """
+
+    def __init__(self):
+        self.my_turn = False
+        self.waiting_for = None
+        self.top_card = "Waiting..."
+        self.hand = []
+        self.valid_moves = []
+        self.player_number = None
+        self.needs_render = False
+        self._hand_lines = None  # Collects a hand block until its footer arrives
+
+    def apply(self, message):
+        """
+        Updates the state from one server message.
+
+        Args:
+            message (str): A single line from the server.
+
+        Returns:
+            str: Text to show the player, or None if the message only changes state.
+        """
+        msg = message.strip()
+        if not msg:
+            return None  # Ignore empty lines
+
+        if self._hand_lines is not None:
+            if msg == HAND_FOOTER:
+                self.hand = self._hand_lines
+                self._hand_lines = None
+            else:
+                self._hand_lines.append(message.rstrip())
+            return None
+
+        if msg == HAND_HEADER:
+            self._hand_lines = []
+
+        elif msg.startswith(TOP_CARD):
+            self.top_card = msg.split(':', 1)[1]
+
+        elif msg.startswith(VALID_MOVES):
+            moves_str = msg.split(':', 1)[1]
+            self.valid_moves = [int(x) for x in moves_str.split(',')] if moves_str else []
+
+        elif msg == NO_VALID_MOVES:
+            self.valid_moves = []
+
+        elif msg == YOUR_TURN:
+            self.my_turn = True
+            self.waiting_for = None
+            self.needs_render = True
+
+        elif msg in PROMPTS:
+            # The server sends the question itself just before the keyword
+            self.my_turn = True
+            self.waiting_for = PROMPTS[msg]
+
+        elif "Top card is now:" in msg:
+            pass  # We handle this with TOP_CARD
+
+        else:
+            if msg.startswith("Welcome, Player "):
+                self.player_number = int(msg.rstrip('!').rsplit(' ', 1)[1])
+            return msg  # Print all other messages
+
+        return None
+
+    def command_for_input(self, command):
+        """
+        Checks a line typed by the player.
+
+        Args:
+            command (str): The typed line, without the newline.
 
-# --- Global State ---
-my_turn = False
-waiting_for = None
-current_top_card = "Waiting..."
-my_hand_str = "Waiting for hand..."
-my_valid_moves = []
+        Returns:
+            tuple: (line to send or None, notice to show or None).
+        """
+        if not command:
+            return None, None
 
+        if self.my_turn and self.waiting_for is not None:
+            self.my_turn = False
+            return command, None
 
-def display_game_state():
-    global current_top_card, my_hand_str, my_valid_moves, my_turn, waiting_for
+        if self.my_turn and (command.lower().startswith('play ') or command.lower() == 'draw'):
+            self.my_turn = False
+            return command, None
 
-    # 1. Print the Top Card Box
-    print("\n" + "=" * 25)
-    # .strip() to remove any extra newlines
-    print(f"   TOP CARD: {current_top_card.strip()}")
-    print("=" * 25 + "\n")
+        if self.my_turn:
+            return None, "Invalid command. (e.g., 'play 3' or 'draw')"
 
-    # 2. Print the Hand, highlighting valid moves
-    print("--- Your Hand ---")
+        if command.lower().startswith('play '):
+            # Out of turn: the server accepts it only as a jump-in
+            return command, None
 
-    hand_lines = my_hand_str.strip().split('\n')
+        return None, "It's not your turn yet."
 
-    # Iterate through the actual card lines
-    # The hand string is now just "--- Your Hand ---\n...cards...\n-----------------"
-    # So we skip the first line (header) and last line (footer)
-    for line in hand_lines[1:-1]:
-        if not line.strip():
-            continue
 
+def render_game_state(state):
+    """
+    Builds the turn display: top card, hand with valid moves marked, and a hint.
+
+    Args:
+        state (ClientState): The current client state.
+
+    Returns:
+        str: The text to print.
+    """
+    lines = ["", "=" * 25, f"   TOP CARD: {state.top_card.strip()}", "=" * 25, "", HAND_HEADER]
+
+    for line in state.hand:
         try:
             card_index = int(line.strip().split('.')[0])
+        except ValueError:
+            card_index = None
+        lines.append(f"{line}   <-- VALID" if card_index in state.valid_moves else line)
 
-            if card_index in my_valid_moves:
-                print(f"{line}   <-- VALID")
-            else:
-                print(line)
-        except:
-            print(line)
-
-    print("-----------------\n")
+    lines.append(HAND_FOOTER + "\n")
 
-    # 3. Print the suggestion
-    if not my_valid_moves:
-        print(">>> You have no valid cards. You must type 'draw'.")
+    if not state.valid_moves:
+        lines.append(">>> You have no valid cards. You must type 'draw'.")
     else:
-        print(">>> Type 'play N' (e.g., 'play 3') or 'draw'.")
-
-    # 4. Set the turn flags
-    my_turn = True
-    waiting_for = None
+        lines.append(">>> Type 'play N' (e.g., 'play 3') or 'draw'.")
 
+    state.needs_render = False
+    return '\n'.join(lines)
 
-# --- NEW: Message processing function ---
-def process_message(message):
-    global my_turn, waiting_for
-    global current_top_card, my_hand_str, my_valid_moves
 
-    # .strip() is crucial to remove the \n
-    msg = message.strip()
-    if not msg:
-        return  # Ignore empty lines
+def bot_command(state):
+    """
+    Picks an answer for a headless bot: the first valid card, otherwise draw.
 
-    try:
-        if msg.startswith("TOP_CARD:"):
-            current_top_card = msg.split(':', 1)[1]
+    Args:
+        state (ClientState): The current client state.
 
-        elif msg.startswith("--- Your Hand ---"):
-            # The hand message is multi-line, but send_hand() in server
-            # sends it as one block with one \n at the end.
-            my_hand_str = msg
+    Returns:
+        str: The command to send, or None if it is not the bot's move.
+    """
+    if not state.my_turn:
+        return None
 
-        elif msg.startswith("VALID_MOVES:"):
-            moves_str = msg.split(':', 1)[1]
-            if moves_str:
-                my_valid_moves = [int(x) for x in moves_str.split(',')]
-            else:
-                my_valid_moves = []
+    if state.waiting_for == "COLOR":
+        colors = [line.split('.', 1)[1].split(' ')[0] for line in state.hand if '.' in line]
+        colors = [clr for clr in colors if clr in ('RED', 'GREEN', 'BLUE', 'YELLOW')]
+        return max(set(colors), key=colors.count) if colors else 'RED'
+    if state.waiting_for == "DRAW":
+        return 'p'
+    if state.waiting_for == "CHALLENGE":
+        return 'a'
+    if state.waiting_for == "PLAYER":
+        return '2' if state.player_number == 1 else '1'
 
-        elif msg == "NO_VALID_MOVES":
-            my_valid_moves = []
+    if state.valid_moves:
+        return f"play {state.valid_moves[0]}"
+    return 'draw'
 
-        elif msg == "YOUR_TURN":
-            display_game_state()
 
-        elif msg == "CHOOSE_COLOR":
-            my_turn = True
-            waiting_for = "COLOR"
-            print("\nWhat color? (RED, GREEN, BLUE, YELLOW)")
+# --- Threaded Client ---
+state = ClientState()
 
-        elif msg == "DRAW_CHOICE":
-            my_turn = True
-            waiting_for = "DRAW"
-            print("\nPlay the card you drew? (p)lay or (k)eep?")
 
-        # --- Regular Broadcast Messages ---
-        else:
-            if "Top card is now:" in msg:
-                pass  # We handle this with TOP_CARD:
-            else:
-                print(msg)  # Print all other messages
+def process_message(message):
+    try:
+        text = state.apply(message)
+        if text is not None:
+            print(text)
+        if state.needs_render:
+            print(render_game_state(state))
 
     except Exception as e:
-        print(f"--- Error processing message: {msg} ---")
+        print(f"--- Error processing message: {message.strip()} ---")
         print(f"--- {e} ---")
 
 
 # --- UPDATED: Network Receiver ---
 def receive_messages(client_socket):
-    data_buffer = ""
+    framer = LineFramer(client_socket)
     while True:
         try:
-            # Receive data and add to buffer
-            data = client_socket.recv(1024).decode('utf-8')
-            if not data:
+            # Receive data; partial lines stay buffered in the framer
+            messages = framer.read_frames()
+            if messages is None:
                 print("Disconnected from server.")
                 break
 
-            data_buffer += data
-
-            # Process all complete messages (lines) in the buffer
-            while '\n' in data_buffer:
-                # Split off the first complete message
-                message, data_buffer = data_buffer.split('\n', 1)
+            # Process all complete messages (lines)
+            for message in messages:
                 process_message(message)
 
         except:
@@ -135,51 +221,33 @@ def receive_messages(client_socket):
 
 
 # --- Main Client Logic (UPDATED) ---
-def main():
-    global my_turn, waiting_for
-
-    host_ip = input("Enter the Host's IP Address: ")
-    PORT = 5555
+def main(host_ip=None, port=PORT, name=None):
+    if host_ip is None:
+        host_ip = input("Enter the Host's IP Address: ")
 
     client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     try:
-        client.connect((host_ip, PORT))
+        client.connect((host_ip, port))
         print("Connected to server! Waiting for game to start...")
     except Exception as e:
-        print(f"Failed to connect to {host_ip}:{PORT}. Error: {e}")
+        print(f"Failed to connect to {host_ip}:{port}. Error: {e}")
         return
 
+    if name:
+        client.send(f"NAME {name}\n".encode('utf-8'))
+
     # Start the receiver thread
     receiver = threading.Thread(target=receive_messages, args=(client,), daemon=True)
     receiver.start()
 
     while True:
         try:
-            if my_turn:
-                command = input()
-                if not command:
-                    continue
-
+            to_send, notice = state.command_for_input(input())
+            if notice:
+                print(notice)
+            if to_send:
                 # We must add \n to our sends to match the server protocol
-                command += '\n'
-
-                if waiting_for == "COLOR":
-                    client.send(command.encode('utf-8'))
-                    my_turn = False
-
-                elif waiting_for == "DRAW":
-                    client.send(command.encode('utf-8'))
-                    my_turn = False
-
-                elif command.lower().startswith('play ') or command.lower() == 'draw\n':
-                    client.send(command.encode('utf-8'))
-                    my_turn = False
-
-                else:
-                    print("Invalid command. (e.g., 'play 3' or 'draw')")
-
-            else:
-                time.sleep(0.1)
+                client.send((to_send + '\n').encode('utf-8'))
 
         except (EOFError, KeyboardInterrupt):
             print("\nDisconnecting...")
@@ -191,5 +259,174 @@ def main():
             break
 
 
+# --- Asyncio Client ---
+def start_stdin_reader(loop, lines):
+    """
+    Feeds typed lines into an asyncio queue without polling. Uses the event
+    loop's reader on POSIX and falls back to a thread where stdin can't be
+    watched (e.g. Windows consoles). None marks end of input.
+
+    Args:
+        loop (asyncio.AbstractEventLoop): The running event loop.
+        lines (asyncio.Queue): Receives each line, without the newline.
+    """
+    fd = sys.stdin.fileno()
+    framer = LineFramer()
+
+    def on_readable():
+        # Raw reads: a buffered readline could hold lines the fd will never signal again
+        data = os.read(fd, 4096)
+        if not data:
+            loop.remove_reader(fd)
+            for line in framer.feed(b'\n'):  # A last line without a newline
+                if line:
+                    lines.put_nowait(line)
+            lines.put_nowait(None)
+            return
+        for line in framer.feed(data):
+            lines.put_nowait(line.rstrip('\r'))
+
+    try:
+        loop.add_reader(fd, on_readable)
+        return
+    except (NotImplementedError, ValueError, OSError):
+        pass
+
+    def read_blocking():
+        for line in sys.stdin:
+            loop.call_soon_threadsafe(lines.put_nowait, line.rstrip('\n'))
+        loop.call_soon_threadsafe(lines.put_nowait, None)
+
+    threading.Thread(target=read_blocking, daemon=True).start()
+
+
+async def run_client(host, port=PORT, bot=False, quiet=False, name=None):
+    """
+    Plays one connection on the running event loop. Server messages update a
+    ClientState, and the turn display is redrawn at most once per burst of
+    messages. With bot=True no stdin is read and moves come from bot_command,
+    so many bots can share one loop for load tests.
+
+    Args:
+        host (str): The server address.
+        port (int): The server port.
+        bot (bool): Play automatically instead of reading stdin.
+        quiet (bool): Don't print server messages (useful for many bots).
+        name (str): The name to record results under (anonymous if None).
+
+    Returns:
+        ClientState: The final state when the connection closes.
+    """
+    loop = asyncio.get_running_loop()
+    reader, writer = await asyncio.open_connection(host, port)
+    client_state = ClientState()
+    framer = LineFramer()
+    render_scheduled = False
+
+    def show(text):
+        if not quiet:
+            print(text)
+
+    def render():
+        nonlocal render_scheduled
+        render_scheduled = False
+        if client_state.needs_render:
+            show(render_game_state(client_state))
+
+    def send(line):
+        writer.write((line + '\n').encode('utf-8'))
+
+    if name:
+        send(f"NAME {name}")
+
+    async def receive():
+        nonlocal render_scheduled
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                show("Disconnected from server.")
+                return
+
+            for message in framer.feed(data):
+                text = client_state.apply(message)
+                if text is not None:
+                    show(text)
+
+            if bot:
+                command = bot_command(client_state)
+                if command is not None:
+                    client_state.my_turn = False
+                    send(command)
+            elif client_state.needs_render and not render_scheduled:
+                render_scheduled = True
+                loop.call_soon(render)
+
+    async def read_input(lines):
+        while True:
+            line = await lines.get()
+            if line is None:
+                return
+            to_send, notice = client_state.command_for_input(line)
+            if notice:
+                show(notice)
+            if to_send:
+                send(to_send)
+                await writer.drain()
+
+    tasks = [asyncio.ensure_future(receive())]
+    if not bot:
+        lines = asyncio.Queue()
+        start_stdin_reader(loop, lines)
+        tasks.append(asyncio.ensure_future(read_input(lines)))
+
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        if not bot:
+            try:
+                loop.remove_reader(sys.stdin.fileno())
+            except (NotImplementedError, ValueError, OSError):
+                pass
+        writer.close()
+
+    return client_state
+
+
+async def run_bots(host, port, count):
+    """
+    Connects several bots at once, e.g. for load tests.
+
+    Args:
+        host (str): The server address.
+        port (int): The server port.
+        count (int): The number of bots.
+    """
+    await asyncio.gather(*(run_client(host, port, bot=True, quiet=count > 1) for _ in range(count)),
+                         return_exceptions=True)
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="UNO game client")
+    parser.add_argument('--host', help="The server address (asked for if not given)")
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help="Use the single-threaded asyncio client")
+    parser.add_argument('--bots', type=int, default=0,
+                        help="Run this many headless bots instead of a player")
+    parser.add_argument('--name', help="Record your results under this name (anonymous if not given)")
+    args = parser.parse_args()
+
+    if args.bots:
+        asyncio.run(run_bots(args.host or '127.0.0.1', args.port, args.bots))
+    elif args.use_async:
+        host_ip = args.host or input("Enter the Host's IP Address: ")
+        try:
+            asyncio.run(run_client(host_ip, args.port, name=args.name))
+        except KeyboardInterrupt:
+            print("\nDisconnecting...")
+        except OSError as e:
+            print(f"Failed to connect to {host_ip}:{args.port}. Error: {e}")
+    else:
+        main(args.host, args.port, args.name)
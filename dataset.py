@@ -0,0 +1,269 @@
+# Save this as dataset.py
+import argparse
+import os
+import queue
+import threading
+import time
+from game import CARD_FACES, color, card_id
+
+try:
+    import numpy as np
+except ImportError:  # Only needed for exporting
+    np = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet output is optional
+    pa = None
+    pq = None
+
+NUM_FACES = len(CARD_FACES)
+DRAW_ACTION = NUM_FACES  # Actions 0-53 play a card face, 54 draws
+NUM_ACTIONS = NUM_FACES + 1
+COLOR_INDEX = {clr: i for i, clr in enumerate(color)}
+
+# Feature layout: hand face counts | top card face one-hot | active color one-hot | pending draw
+FEATURE_SIZE = NUM_FACES + NUM_FACES + len(color) + 1
+TOP_OFFSET = NUM_FACES
+COLOR_OFFSET = 2 * NUM_FACES
+PENDING_OFFSET = COLOR_OFFSET + len(color)
+
+DEFAULT_CHUNK_ROWS = 1 << 16
+
+
+def encode_decision(game, seat, legal, choice):
+    """
+    Encodes one decision compactly until the game's outcome is known.
+
+    Args:
+        game (SimulatedGame): The game being played.
+        seat (int): The seat making the decision.
+        legal (list): The 0-indexed hand positions that can be played.
+        choice (int): The hand position played, or None for draw.
+
+    Returns:
+        tuple: (seat, hand face IDs, top face ID, active color index,
+            pending draw, legal action IDs, chosen action ID).
+    """
+    cards = game.hands[seat].cards
+    top_card = game.top_card
+    return (seat,
+            [card_id(card) for card in cards],
+            card_id(top_card),
+            COLOR_INDEX.get(top_card.color, -1),
+            game.pending_draw,
+            [card_id(cards[i]) for i in legal],
+            DRAW_ACTION if choice is None else card_id(cards[choice]))
+
+
+class _Chunk:
+    """
+    One preallocated set of column arrays. Two of these are swapped between
+    the simulation (filling) and the writer thread (saving).
+    """
+
+    def __init__(self, rows):
+        self.features = np.zeros((rows, FEATURE_SIZE), dtype=np.uint8)
+        self.legal_mask = np.zeros((rows, NUM_ACTIONS), dtype=np.bool_)
+        self.action = np.zeros(rows, dtype=np.int16)
+        self.outcome = np.zeros(rows, dtype=np.int8)
+        self.game_id = np.zeros(rows, dtype=np.int64)
+        self.seat = np.zeros(rows, dtype=np.int8)
+        self.size = 0
+
+    def columns(self):
+        n = self.size
+        return {'features': self.features[:n], 'legal_mask': self.legal_mask[:n],
+                'action': self.action[:n], 'outcome': self.outcome[:n],
+                'game_id': self.game_id[:n], 'seat': self.seat[:n]}
+
+
+class DatasetExporter:
+    """
+    Streams simulated decisions into chunked columnar training files.
+
+    Each row is (features, legal-move mask, chosen action, outcome) plus the
+    game ID and seat. The outcome is +1 if the deciding seat went on to win,
+    -1 if it lost and 0 if the game was abandoned. Chunks are double
+    buffered: the simulation fills one while a background thread writes the
+    other, so export only slows the simulation if the disk can't keep up.
+
+    With format 'npy' each chunk is a directory of .npy files, one per column,
+    which np.load(..., mmap_mode='r') can memory-map. With 'parquet' (needs
+    pyarrow) each chunk is one .parquet file.
+
+    Attributes:
+        out_dir (str): The directory the chunks are written to.
+        chunk_rows (int): The number of rows per chunk.
+        format (str): 'npy' or 'parquet'.
+        rows_written (int): The number of rows handed to the writer so far.
+    """
+
+    def __init__(self, out_dir, chunk_rows=DEFAULT_CHUNK_ROWS, format='npy'):
+        if np is None:
+            raise RuntimeError("Exporting datasets requires numpy (pip install numpy)")
+        if format == 'parquet' and pa is None:
+            raise RuntimeError("Parquet output requires pyarrow (pip install pyarrow)")
+        if format not in ('npy', 'parquet'):
+            raise ValueError(f"Unknown format '{format}'. Use 'npy' or 'parquet'.")
+
+        self.out_dir = out_dir
+        self.chunk_rows = chunk_rows
+        self.format = format
+        self.rows_written = 0
+        os.makedirs(out_dir, exist_ok=True)
+
+        self._games = {}  # game_id -> encoded decisions awaiting the outcome
+        self._chunks_written = 0
+        self._free = queue.Queue()
+        self._full = queue.Queue()
+        self._free.put(_Chunk(chunk_rows))
+        self._free.put(_Chunk(chunk_rows))
+        self._active = self._free.get()
+        self._error = None
+
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def record(self, game, seat, legal, choice):
+        """
+        Records one decision (the simulator's recorder hook).
+
+        Args:
+            game (SimulatedGame): The game being played.
+            seat (int): The seat making the decision.
+            legal (list): The 0-indexed hand positions that can be played.
+            choice (int): The hand position played, or None for draw.
+        """
+        self._games.setdefault(game.game_id, []).append(encode_decision(game, seat, legal, choice))
+
+    def finish_game(self, game_id, winner):
+        """
+        Labels a finished game's decisions with their outcome and buffers them.
+
+        Args:
+            game_id (int): The finished game.
+            winner (int): The winning seat, or None if the game was abandoned.
+        """
+        decisions = self._games.pop(game_id, [])
+        done = 0
+        while done < len(decisions):
+            chunk = self._active
+            take = min(len(decisions) - done, self.chunk_rows - chunk.size)
+            self._fill(chunk, decisions[done:done + take], game_id, winner)
+            done += take
+            if chunk.size == self.chunk_rows:
+                self._swap()
+
+    def _fill(self, chunk, decisions, game_id, winner):
+        # Writes a run of decisions into the chunk with one numpy operation per column
+        start = chunk.size
+        end = start + len(decisions)
+        rows = np.arange(len(decisions))
+        seats, hand_ids, top_ids, color_indexes, pending, legal_ids, actions = zip(*decisions)
+
+        features = chunk.features[start:end]
+        features[:] = 0
+        hand_sizes = [len(ids) for ids in hand_ids]
+        np.add.at(features, (np.repeat(rows, hand_sizes), np.fromiter(
+            (face_id for ids in hand_ids for face_id in ids), dtype=np.intp, count=sum(hand_sizes))), 1)
+        features[rows, TOP_OFFSET + np.array(top_ids)] = 1
+        color_indexes = np.array(color_indexes)
+        has_color = color_indexes >= 0
+        features[rows[has_color], COLOR_OFFSET + color_indexes[has_color]] = 1
+        features[:, PENDING_OFFSET] = np.minimum(pending, 255)
+
+        mask = chunk.legal_mask[start:end]
+        mask[:] = False
+        legal_sizes = [len(ids) for ids in legal_ids]
+        mask[np.repeat(rows, legal_sizes), np.fromiter(
+            (face_id for ids in legal_ids for face_id in ids), dtype=np.intp, count=sum(legal_sizes))] = True
+        mask[:, DRAW_ACTION] = True
+
+        seats = np.array(seats, dtype=np.int8)
+        chunk.action[start:end] = actions
+        chunk.outcome[start:end] = 0 if winner is None else np.where(seats == winner, 1, -1)
+        chunk.game_id[start:end] = game_id
+        chunk.seat[start:end] = seats
+        chunk.size = end
+
+    def _swap(self):
+        if self._error is not None:
+            raise self._error
+        self.rows_written += self._active.size
+        self._full.put(self._active)
+        self._active = self._free.get()  # Waits only if the writer is a whole chunk behind
+
+    def close(self):
+        """
+        Writes the partly filled chunk and waits for the writer to finish.
+        Decisions from games that never finished are dropped.
+        """
+        if self._active.size:
+            self._swap()
+        self._full.put(None)
+        self._writer.join()
+        if self._error is not None:
+            raise self._error
+
+    def _write_loop(self):
+        while True:
+            chunk = self._full.get()
+            if chunk is None:
+                break
+            try:
+                self._write_chunk(chunk)
+            except Exception as e:
+                self._error = e
+            chunk.size = 0
+            self._free.put(chunk)
+
+    def _write_chunk(self, chunk):
+        name = f"chunk-{self._chunks_written:05d}"
+        self._chunks_written += 1
+        columns = chunk.columns()
+
+        if self.format == 'parquet':
+            table = pa.table({
+                'features': pa.FixedSizeListArray.from_arrays(columns['features'].ravel(), FEATURE_SIZE),
+                'legal_mask': pa.FixedSizeListArray.from_arrays(columns['legal_mask'].ravel(), NUM_ACTIONS),
+                'action': columns['action'],
+                'outcome': columns['outcome'],
+                'game_id': columns['game_id'],
+                'seat': columns['seat'],
+            })
+            pq.write_table(table, os.path.join(self.out_dir, name + '.parquet'))
+            return
+
+        chunk_dir = os.path.join(self.out_dir, name)
+        os.makedirs(chunk_dir, exist_ok=True)
+        for column, values in columns.items():
+            np.save(os.path.join(chunk_dir, column + '.npy'), values)
+
+
+def main():
+    from simulator import simulate
+
+    parser = argparse.ArgumentParser(description="Export simulated games as a training dataset")
+    parser.add_argument('out_dir')
+    parser.add_argument('--games', type=int, default=10000)
+    parser.add_argument('--players', type=int, default=4)
+    parser.add_argument('--variant', default='classic')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument('--format', choices=('npy', 'parquet'), default='npy')
+    args = parser.parse_args()
+
+    exporter = DatasetExporter(args.out_dir, args.chunk_rows, args.format)
+    start = time.perf_counter()
+    simulate(args.games, args.players, args.variant, args.seed, recorder=exporter)
+    exporter.close()
+    elapsed = time.perf_counter() - start
+
+    print(f"Exported {exporter.rows_written} decisions from {args.games} games "
+          f"to {args.out_dir} in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
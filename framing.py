@@ -0,0 +1,79 @@
+# Save this as framing.py
+DEFAULT_CHUNK_SIZE = 4096
+MAX_FRAME_SIZE = 64 * 1024  # Longest line accepted before the peer is treated as broken
+
+
+class LineFramer:
+    """
+    Splits a byte stream into newline-terminated frames.
+
+    Incoming bytes are read straight into a reusable chunk with recv_into and
+    appended to a single bytearray. Complete frames are decoded directly from
+    that buffer, and consumed bytes are dropped once per read, so a command
+    split across two reads is reassembled and large bursts stay linear.
+    A peer that sends more than max_frame_size bytes without a newline gets
+    a ValueError, so the caller drops it instead of buffering forever.
+
+    Attributes:
+        sock (socket): The socket to read from (None when fed manually).
+        max_frame_size (int): The longest frame accepted, in bytes.
+    """
+
+    def __init__(self, sock=None, chunk_size=DEFAULT_CHUNK_SIZE, max_frame_size=MAX_FRAME_SIZE):
+        self.sock = sock
+        self.max_frame_size = max_frame_size
+        self._buffer = bytearray()
+        self._scan_from = 0  # Bytes before this offset contain no newline
+        self._chunk = bytearray(chunk_size)
+        self._view = memoryview(self._chunk)
+
+    def read_frames(self):
+        """
+        Reads once from the socket and returns the frames it completed.
+
+        Returns:
+            list: The decoded frames (without the newline), possibly empty,
+                or None if the connection was closed.
+
+        Raises:
+            ValueError: If an unterminated frame exceeds max_frame_size.
+        """
+        received = self.sock.recv_into(self._view)
+        if received == 0:
+            return None
+        self._buffer += self._view[:received]
+        return self._extract_frames()
+
+    def feed(self, data):
+        """
+        Adds bytes obtained elsewhere (e.g. from an asyncio stream).
+
+        Args:
+            data (bytes): The bytes to add.
+
+        Returns:
+            list: The decoded frames completed by this data.
+
+        Raises:
+            ValueError: If an unterminated frame exceeds max_frame_size.
+        """
+        self._buffer += data
+        return self._extract_frames()
+
+    def _extract_frames(self):
+        frames = []
+        buffer = self._buffer
+        start = 0
+        end = buffer.find(b'\n', self._scan_from)
+        while end != -1:
+            frames.append(buffer[start:end].decode('utf-8', errors='replace'))
+            start = end + 1
+            end = buffer.find(b'\n', start)
+
+        if start:
+            del buffer[:start]
+        if len(buffer) > self.max_frame_size:
+            buffer.clear()
+            raise ValueError(f"Frame longer than {self.max_frame_size} bytes")
+        self._scan_from = len(buffer)
+        return frames
@@ -1,5 +1,7 @@
 # Save this as game.py
 import random
+from functools import lru_cache
+from profiling import timed
 
 color = ('RED', 'GREEN', 'BLUE', 'YELLOW')
 rank = ('0', '1', '2', '3', '4', '5', '6', '7', '8', '9', 'Skip', 'Reverse', 'Draw2', 'Draw4', 'Wild')
@@ -8,6 +10,23 @@ ctype = {'0': 'number', '1': 'number', '2': 'number', '3': 'number', '4': 'numbe
          'Draw2': 'action', 'Draw4': 'action_nocolor', 'Wild': 'action_nocolor'}
 
 
+@lru_cache(maxsize=None)
+def card_label(card_color, card_rank):
+    """
+    Returns the display label for a card face, computed once per face.
+
+    Args:
+        card_color (str): The color of the card, or None for Wild/Draw4.
+        card_rank (str): The rank of the card.
+
+    Returns:
+        str: The label (e.g., "RED 5" or "Wild").
+    """
+    if card_color is None:
+        return card_rank
+    return card_color + " " + card_rank
+
+
 class Card:
     """
     Represents a single card in the UNO deck.
@@ -31,10 +50,43 @@ class Card:
             self.cardtype = 'action_nocolor'
 
     def __str__(self):
-        if self.color == None:
-            return self.rank
-        else:
-            return self.color + " " + self.rank
+        # Looked up by face rather than cached on the card, since a played
+        # Wild/Draw4 has its color set afterwards
+        return card_label(self.color, self.rank)
+
+
+# Every distinct card face, so a card can be stored as a small integer ID
+CARD_FACES = tuple((clr, ran) for clr in color for ran in rank if ctype[ran] != 'action_nocolor') \
+    + ((None, 'Wild'), (None, 'Draw4'))
+FACE_IDS = {face: face_id for face_id, face in enumerate(CARD_FACES)}
+
+
+def card_id(card):
+    """
+    Returns the face ID of a card (0 to len(CARD_FACES) - 1).
+
+    Args:
+        card (Card): The card.
+
+    Returns:
+        int: The face ID. A Wild/Draw4 keeps its face ID after a color is chosen.
+    """
+    if card.cardtype == 'action_nocolor':
+        return FACE_IDS[(None, card.rank)]
+    return FACE_IDS[(card.color, card.rank)]
+
+
+def card_from_id(face_id):
+    """
+    Creates a card from its face ID.
+
+    Args:
+        face_id (int): The face ID.
+
+    Returns:
+        Card: A new card with that face.
+    """
+    return Card(*CARD_FACES[face_id])
 
 
 class Deck:
@@ -43,17 +95,19 @@ class Deck:
 
     Attributes:
         deck (list): The list of Card objects in the deck.
+        seed (int): The seed for shuffling, so a game can be replayed (None for random).
+        quiet (bool): Rebuild without printing a notice (e.g. in bulk simulations).
     """
 
-    def __init__(self):
+    def __init__(self, seed=None, quiet=False):
         self.deck = []
+        self.seed = seed
+        self.quiet = quiet
+        self.rng = random.Random(seed)
         self.build()
 
     def __str__(self):
-        deck_comp = ''
-        for card in self.deck:
-            deck_comp += '\n' + card.__str__()
-        return 'The deck has ' + deck_comp
+        return 'The deck has ' + ''.join('\n' + str(card) for card in self.deck)
 
     def build(self):
         """
@@ -76,12 +130,14 @@ class Deck:
             self.deck.append(Card(None, 'Wild'))
             self.deck.append(Card(None, 'Draw4'))
 
+    @timed()
     def shuffle(self):
         """
         Shuffles the deck to randomize the order of cards.
         """
-        random.shuffle(self.deck)
+        self.rng.shuffle(self.deck)
 
+    @timed()
     def deal(self):
         """
         Deals a card from the deck. Rebuilds and reshuffles if the deck is empty.
@@ -90,7 +146,8 @@ class Deck:
             Card: The card dealt from the deck.
         """
         if len(self.deck) == 0:
-            print("Deck is empty! Rebuilding and shuffling...")
+            if not self.quiet:
+                print("Deck is empty! Rebuilding and shuffling...")
             self.build()
             self.shuffle()
             # A real game would use the discard pile, but this is simpler
@@ -107,6 +164,7 @@ class Hand:
 
     def __init__(self):
         self.cards = []
+        self._hand_str = None  # Cached render, cleared whenever the hand changes
 
     def add_card(self, card):
         """
@@ -116,6 +174,7 @@ class Hand:
             card (Card): The card to add.
         """
         self.cards.append(card)
+        self._hand_str = None
 
     def remove_card(self, place):
         """
@@ -128,7 +187,9 @@ class Hand:
             Card: The removed card.
         """
         # 'place' is 1-indexed for user-friendliness
-        return self.cards.pop(place - 1)
+        card = self.cards.pop(place - 1)
+        self._hand_str = None
+        return card
 
     def get_card(self, place):
         """
@@ -152,19 +213,21 @@ class Hand:
         """
         return len(self.cards)
 
+    @timed()
     def get_hand_str(self):
         """
         Returns a string representation of the player's hand.
+        The result is cached until the hand changes.
 
         Returns:
             str: The string representation of the hand.
         """
-        hand_str = ""
-        for i in range(len(self.cards)):
-            hand_str += f' {i + 1}.{str(self.cards[i])}\n'
-        return hand_str
+        if self._hand_str is None:
+            self._hand_str = ''.join(f' {i}.{card}\n' for i, card in enumerate(self.cards, 1))
+        return self._hand_str
 
 
+@timed()
 def single_card_check(top_card, card):
     """
     Checks if a card can be played on top of the current top card.
@@ -0,0 +1,85 @@
+# Save this as hibernation.py
+import json
+import struct
+from game import Deck, Hand, card_id, card_from_id, color
+
+MAGIC = b'UNO1'
+# seed, turn, reverse_direction, pending_draw, top face ID, top color index (-1 for none),
+# number of hands, deck size
+HEADER = struct.Struct('<IBBHBbBH')
+COUNT = struct.Struct('<H')
+
+
+def pack_game(deck, hands, top_card, turn, reverse_direction, pending_draw=0, extra=None):
+    """
+    Serializes a game into a compact blob of card face IDs.
+
+    Args:
+        deck (Deck): The draw pile.
+        hands (list): One Hand per seat.
+        top_card (Card): The current top card on the pile.
+        turn (int): The seat whose turn it is.
+        reverse_direction (bool): Whether play runs backwards.
+        pending_draw (int): Cards owed from stacked draws.
+        extra (dict): Any other JSON-serializable state to keep with the game.
+
+    Returns:
+        bytes: The blob.
+    """
+    top_color = color.index(top_card.color) if top_card.color in color else -1
+    parts = [MAGIC, HEADER.pack(deck.seed or 0, turn, reverse_direction, pending_draw,
+                                card_id(top_card), top_color, len(hands), len(deck.deck)),
+             bytes(card_id(card) for card in deck.deck)]
+    for hand in hands:
+        parts.append(COUNT.pack(hand.no_of_cards()))
+        parts.append(bytes(card_id(card) for card in hand.cards))
+    parts.append(json.dumps(extra or {}, separators=(',', ':')).encode('utf-8'))
+    return b''.join(parts)
+
+
+def unpack_game(blob):
+    """
+    Rebuilds a game from a blob made by pack_game. The rebuilt deck's shuffle
+    generator restarts from the seed; reseed deck.rng to vary it.
+
+    Args:
+        blob (bytes): The blob.
+
+    Returns:
+        dict: deck, hands, top_card, turn, reverse_direction, pending_draw and extra.
+    """
+    if blob[:len(MAGIC)] != MAGIC:
+        raise ValueError("Not a hibernated game")
+
+    offset = len(MAGIC)
+    seed, turn, reverse_direction, pending_draw, top_id, top_color, num_hands, deck_size = \
+        HEADER.unpack_from(blob, offset)
+    offset += HEADER.size
+
+    deck = Deck(seed=seed)
+    deck.deck = [card_from_id(face_id) for face_id in blob[offset:offset + deck_size]]
+    offset += deck_size
+
+    hands = []
+    for _ in range(num_hands):
+        (size,) = COUNT.unpack_from(blob, offset)
+        offset += COUNT.size
+        hand = Hand()
+        for face_id in blob[offset:offset + size]:
+            hand.add_card(card_from_id(face_id))
+        offset += size
+        hands.append(hand)
+
+    top_card = card_from_id(top_id)
+    if top_color >= 0:
+        top_card.color = color[top_color]
+
+    return {
+        'deck': deck,
+        'hands': hands,
+        'top_card': top_card,
+        'turn': turn,
+        'reverse_direction': bool(reverse_direction),
+        'pending_draw': pending_draw,
+        'extra': json.loads(blob[offset:].decode('utf-8')),
+    }
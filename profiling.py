@@ -0,0 +1,119 @@
+# Save this as profiling.py
+import atexit
+import functools
+import os
+import signal
+import threading
+import time
+
+# Profiling is decided once at import: set UNO_PROFILE=1 to enable it.
+# When disabled, @timed returns the function untouched, so it costs nothing.
+PROFILING_ENABLED = os.environ.get('UNO_PROFILE', '') not in ('', '0')
+PROFILE_PATH = os.environ.get('UNO_PROFILE_PATH', 'uno_profile.folded')
+
+DEFAULT_ROOM = 'main'
+
+_local = threading.local()
+_all_totals = []  # One {collapsed stack: seconds} dict per thread
+_totals_lock = threading.Lock()
+
+
+def _thread_state():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+        _local.totals = {}
+        with _totals_lock:
+            _all_totals.append(_local.totals)
+    return stack, _local.totals
+
+
+def set_room(room):
+    """
+    Attributes everything timed on the calling thread to a room.
+
+    Args:
+        room (str): The room name (becomes the root frame of each stack).
+    """
+    _local.room = room
+
+
+def timed(name=None):
+    """
+    Decorator that records the function's self time under the current room
+    and the stack of timed functions it was called from.
+
+    Args:
+        name (str): The frame name. Defaults to the function's qualified name.
+
+    Returns:
+        function: The decorator.
+    """
+    def decorate(func):
+        if not PROFILING_ENABLED:
+            return func
+
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            stack, totals = _thread_state()
+            frame = [label, 0.0]  # [name, time spent in timed children]
+            stack.append(frame)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                key = ';'.join([getattr(_local, 'room', DEFAULT_ROOM)] + [f[0] for f in stack])
+                stack.pop()
+                totals[key] = totals.get(key, 0.0) + elapsed - frame[1]
+                if stack:
+                    stack[-1][1] += elapsed
+
+        return wrapper
+
+    return decorate
+
+
+def collapsed_stacks():
+    """
+    Returns the recorded timings as flamegraph-compatible collapsed stacks,
+    one "room;action;callee microseconds" line per stack.
+
+    Returns:
+        str: The collapsed stacks.
+    """
+    merged = {}
+    with _totals_lock:
+        for totals in _all_totals:
+            for key, seconds in list(totals.items()):
+                merged[key] = merged.get(key, 0.0) + seconds
+
+    return ''.join(f"{key} {round(seconds * 1e6)}\n" for key, seconds in sorted(merged.items()))
+
+
+def dump(path=None):
+    """
+    Writes the collapsed stacks to a file (e.g. for flamegraph.pl or speedscope).
+
+    Args:
+        path (str): The output file. Defaults to UNO_PROFILE_PATH.
+    """
+    path = path or PROFILE_PATH
+    with open(path, 'w') as f:
+        f.write(collapsed_stacks())
+    print(f"Profile written to {path}")
+
+
+def install_dump_triggers():
+    """
+    Dumps the profile on SIGUSR1 (where available) and at exit. Must be
+    called from the main thread. Does nothing when profiling is disabled.
+    """
+    if not PROFILING_ENABLED:
+        return
+
+    atexit.register(dump)
+    if hasattr(signal, 'SIGUSR1'):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: dump())
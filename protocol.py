@@ -0,0 +1,26 @@
+# Save this as protocol.py
+# Keywords of the newline-delimited protocol, shared by the server, the
+# client and the WebSocket gateway so they can't drift apart.
+
+HAND_HEADER = "--- Your Hand ---"
+HAND_FOOTER = "-----------------"
+
+# Prefixes, followed by the value (e.g. "TOP_CARD:RED 5", "VALID_MOVES:1,3", "HAND_SIZES:7,5")
+TOP_CARD = "TOP_CARD:"
+VALID_MOVES = "VALID_MOVES:"
+HAND_SIZES = "HAND_SIZES:"
+
+NO_VALID_MOVES = "NO_VALID_MOVES"
+YOUR_TURN = "YOUR_TURN"
+
+# Prompt keyword -> what the player's next line answers
+CHOOSE_COLOR = "CHOOSE_COLOR"
+DRAW_CHOICE = "DRAW_CHOICE"
+CHALLENGE_CHOICE = "CHALLENGE_CHOICE"
+CHOOSE_PLAYER = "CHOOSE_PLAYER"
+PROMPTS = {
+    CHOOSE_COLOR: "COLOR",
+    DRAW_CHOICE: "DRAW",
+    CHALLENGE_CHOICE: "CHALLENGE",
+    CHOOSE_PLAYER: "PLAYER",
+}
@@ -0,0 +1,197 @@
+# Save this as results_store.py
+import json
+import queue
+import sqlite3
+import threading
+import time
+
+DEFAULT_DB_PATH = 'uno_results.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    finished_at REAL NOT NULL,
+    seed INTEGER,
+    num_players INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    winner_seat INTEGER,
+    winner TEXT,
+    actions TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS game_players (
+    game_id INTEGER NOT NULL,
+    player TEXT NOT NULL,
+    seat INTEGER NOT NULL,
+    won INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS player_stats (
+    player TEXT PRIMARY KEY,
+    games INTEGER NOT NULL,
+    wins INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_game_players_player ON game_players (player, game_id DESC);
+CREATE INDEX IF NOT EXISTS idx_player_stats_wins ON player_stats (wins DESC, games);
+"""
+
+
+class ResultsStore:
+    """
+    Stores finished games in a local SQLite database.
+
+    record_game only queues the result; a background writer thread inserts
+    queued games in batches, one transaction per batch, so game threads never
+    wait on disk. Per-player totals are kept in player_stats as games are
+    written, so leaderboard queries read an index instead of scanning history.
+
+    Players are identified by the name they chose. Anonymous seats (None) are
+    kept in the game's seat count and winning seat but never in per-player
+    history or totals, so unrelated people are not merged under a seat label.
+
+    Attributes:
+        path (str): The path of the SQLite database file.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH, batch_size=2000):
+        self.path = path
+        self.batch_size = batch_size
+        self._pending = queue.Queue()
+        self._local = threading.local()
+
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        conn.commit()
+        conn.close()
+
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _reader(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def record_game(self, players, winner, seed=None, length=0, actions=None, finished_at=None):
+        """
+        Queues a finished game for writing. Never blocks on disk.
+
+        Args:
+            players (list): The player names in seat order, None for anonymous seats.
+            winner (int): The winning seat, or None if abandoned.
+            seed (int): The deck seed the game was played with.
+            length (int): The number of turns taken.
+            actions (dict): Counts per action type (e.g., {'play': 30, 'draw': 12}).
+            finished_at (float): Unix time the game ended. Defaults to now.
+        """
+        if finished_at is None:
+            finished_at = time.time()
+        self._pending.put((list(players), winner, seed, length, actions or {}, finished_at))
+
+    def flush(self):
+        """
+        Blocks until every queued game has been written.
+        """
+        self._pending.join()
+
+    def close(self):
+        """
+        Writes any queued games and stops the writer thread.
+        """
+        self._pending.put(None)
+        self._writer.join()
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            batch = [self._pending.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = None in batch
+            games = [game for game in batch if game is not None]
+            try:
+                if games:
+                    self._write_batch(conn, games)
+            except Exception as e:  # A bad batch is lost, but the writer keeps running
+                print(f"Failed to store {len(games)} game results: {e}")
+            finally:
+                for _ in batch:
+                    self._pending.task_done()
+            if stop:
+                break
+        conn.close()
+
+    def _write_batch(self, conn, games):
+        with conn:
+            # IDs are read under the write lock, so other stores on the same file can't reuse them
+            conn.execute("BEGIN IMMEDIATE")
+            game_id = conn.execute("SELECT MAX(id) FROM games").fetchone()[0] or 0
+
+            game_rows = []
+            player_rows = []
+            totals = {}
+            for players, winner, seed, length, actions, finished_at in games:
+                game_id += 1
+                game_rows.append((game_id, finished_at, seed, len(players), length, winner,
+                                  players[winner] if winner is not None else None,
+                                  json.dumps(actions, separators=(',', ':'))))
+                for seat, player in enumerate(players):
+                    if player is None:
+                        continue
+                    won = int(seat == winner)
+                    player_rows.append((game_id, player, seat, won))
+                    stats = totals.setdefault(player, [0, 0])
+                    stats[0] += 1
+                    stats[1] += won
+
+            conn.executemany("INSERT INTO games VALUES (?, ?, ?, ?, ?, ?, ?, ?)", game_rows)
+            conn.executemany("INSERT INTO game_players VALUES (?, ?, ?, ?)", player_rows)
+            conn.executemany(
+                "INSERT INTO player_stats VALUES (?, ?, ?) ON CONFLICT (player) DO UPDATE"
+                " SET games = games + excluded.games, wins = wins + excluded.wins",
+                [(player, stats[0], stats[1]) for player, stats in totals.items()])
+
+    def leaderboard(self, limit=10):
+        """
+        Returns the players with the most wins.
+
+        Args:
+            limit (int): The number of players to return.
+
+        Returns:
+            list: (player, wins, games) tuples, most wins first.
+        """
+        return self._reader().execute(
+            "SELECT player, wins, games FROM player_stats ORDER BY wins DESC, games LIMIT ?",
+            (limit,)).fetchall()
+
+    def player_history(self, player, limit=20):
+        """
+        Returns a player's most recent games.
+
+        Args:
+            player (str): The player's name.
+            limit (int): The number of games to return.
+
+        Returns:
+            list: Dicts with the game id, time, seed, length, seat, winning seat,
+                winner's name (None if anonymous) and action counts.
+        """
+        rows = self._reader().execute(
+            "SELECT g.id, g.finished_at, g.seed, g.length, gp.seat, g.winner_seat, g.winner, g.actions"
+            " FROM game_players gp JOIN games g ON g.id = gp.game_id"
+            " WHERE gp.player = ? ORDER BY gp.game_id DESC LIMIT ?",
+            (player, limit)).fetchall()
+        return [{'game_id': row[0], 'finished_at': row[1], 'seed': row[2], 'length': row[3],
+                 'seat': row[4], 'winner_seat': row[5], 'winner': row[6],
+                 'actions': json.loads(row[7])}
+                for row in rows]
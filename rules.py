@@ -0,0 +1,107 @@
+# Save this as rules.py
+from game import rank, ctype, single_card_check
+from profiling import timed
+
+# --- Rule Options ---
+# stack_draws: a Draw2/Draw4 can be answered with another draw card to pass the penalty on
+# draw4_challenge: the target of a Draw4 may challenge it as an illegal play
+# jump_in: a player may play an identical card (same color and rank) out of turn
+# seven_zero: a 7 swaps hands with a chosen player, a 0 rotates all hands
+# reverse_skips: with two players, Reverse acts as a Skip
+RULE_OPTIONS = ('stack_draws', 'draw4_challenge', 'jump_in', 'seven_zero', 'reverse_skips')
+
+VARIANTS = {
+    'classic': (),
+    'official': ('draw4_challenge', 'reverse_skips'),
+    'stacking': ('stack_draws', 'reverse_skips'),
+    'house': RULE_OPTIONS,
+}
+
+# Which draw cards may be stacked on top of which
+STACKS_ON = {
+    'Draw2': frozenset(('Draw2', 'Draw4')),
+    'Draw4': frozenset(('Draw4',)),
+}
+
+DRAW_AMOUNTS = {'Draw2': 2, 'Draw4': 4}
+
+
+class RuleSet:
+    """
+    The rules for one game, compiled into lookup tables when the game starts.
+
+    Every rank maps to the name of the effect it triggers, so resolving a card
+    is a single dict lookup no matter how many options are enabled.
+
+    Attributes:
+        variant (str): The name of the variant (a key of VARIANTS).
+        options (frozenset): The enabled rule options.
+        effects (dict): Maps each rank to its effect name.
+        stackable (dict): Maps a draw rank to the ranks that may be stacked on it
+            (empty when stacking is off).
+    """
+
+    def __init__(self, variant='classic', num_players=2):
+        if variant not in VARIANTS:
+            raise ValueError(f"Unknown variant '{variant}'. Choose from: {', '.join(VARIANTS)}")
+
+        self.variant = variant
+        self.options = frozenset(VARIANTS[variant])
+        self.stack_draws = 'stack_draws' in self.options
+        self.draw4_challenge = 'draw4_challenge' in self.options
+        self.jump_in = 'jump_in' in self.options
+
+        effects = {}
+        for ran in rank:
+            if ctype[ran] == 'number':
+                effects[ran] = 'advance'
+        effects['Skip'] = 'skip'
+        effects['Reverse'] = 'reverse'
+        effects['Draw2'] = 'draw'
+        effects['Wild'] = 'wild'
+        effects['Draw4'] = 'wild_draw'
+
+        if 'reverse_skips' in self.options and num_players == 2:
+            effects['Reverse'] = 'skip'
+        if 'seven_zero' in self.options:
+            effects['7'] = 'swap'
+            effects['0'] = 'rotate'
+
+        self.effects = effects
+        self.stackable = STACKS_ON if self.stack_draws else {}
+
+    def __str__(self):
+        if not self.options:
+            return self.variant
+        return f"{self.variant} ({', '.join(opt for opt in RULE_OPTIONS if opt in self.options)})"
+
+    @timed()
+    def can_play(self, top_card, card, pending_draw=0):
+        """
+        Checks if a card can be played, including during a draw stack.
+
+        Args:
+            top_card (Card): The current top card on the pile.
+            card (Card): The card to check.
+            pending_draw (int): Cards owed by the current player from stacked draws.
+
+        Returns:
+            bool: True if the card can be played, False otherwise.
+        """
+        if pending_draw:
+            return card.rank in self.stackable.get(top_card.rank, ())
+        return single_card_check(top_card, card)
+
+    def can_jump_in(self, top_card, card):
+        """
+        Checks if a card can be played out of turn on the current top card.
+
+        Args:
+            top_card (Card): The current top card on the pile.
+            card (Card): The card to check.
+
+        Returns:
+            bool: True if jump-in is enabled and the card is identical to the top card.
+        """
+        return (self.jump_in and card.cardtype != 'action_nocolor'
+                and card.color == top_card.color and card.rank == top_card.rank)
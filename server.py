@@ -1,14 +1,38 @@
 # Save this as server.py
+import argparse
+import os
+import queue
+import random
+import selectors
 import socket
+import tempfile
 import threading
 import time
-from game import Deck, Hand, Card, single_card_check
+from game import Deck, Hand, Card
+from rules import RuleSet, VARIANTS, DRAW_AMOUNTS
+from framing import LineFramer
+from protocol import (HAND_HEADER, HAND_FOOTER, TOP_CARD, VALID_MOVES, HAND_SIZES, NO_VALID_MOVES,
+                      YOUR_TURN, CHOOSE_COLOR, DRAW_CHOICE, CHALLENGE_CHOICE, CHOOSE_PLAYER)
+import profiling
+from profiling import timed
+from results_store import ResultsStore
+from hibernation import pack_game, unpack_game
+from websocket_gateway import WebSocketGateway
 
 # --- Server Configuration ---
 HOST = '0.0.0.0'
 PORT = 5555
 MIN_PLAYERS = 2
 MAX_PLAYERS = 10
+ROOM_NAME = 'table-1'  # Root frame for profiling (UNO_PROFILE=1)
+RULE_VARIANT = 'classic'  # A key of rules.VARIANTS; override with --variant
+HIBERNATE_AFTER = 300  # Seconds without a command before the table is written to disk
+HIBERNATE_CHECK_INTERVAL = 10
+HIBERNATION_DIR = tempfile.gettempdir()
+SPECTATOR_PORT = 5556
+SPECTATOR_BUFFER_LIMIT = 64 * 1024  # Unsent bytes per spectator before it is dropped
+WEBSOCKET_PORT = 5557  # Browser players ("/") and spectators ("/spectate")
+MAX_NAME_LENGTH = 32
 
 # --- Global Game State ---
 clients = []
@@ -20,6 +44,26 @@ game_running = False
 reverse_direction = False
 game_start_lock = threading.Lock()
 game_has_started = False
+game_lock = threading.RLock()  # Serializes player commands, which arrive on separate threads
+rules = None
+pending_draw = 0  # Cards owed by the current player from stacked Draw2/Draw4s
+pending_prompts = {}  # player_index -> prompt keyword awaiting that player's answer
+draw4_offender = None  # (player_index, had_matching_color) for the last Draw4 played
+hand_messages = {}  # player_index -> (rendered hand, encoded hand message)
+last_activity = time.time()
+hibernated_path = None  # Set while the table's cards live on disk instead of in memory
+
+# --- Game Statistics ---
+results_store = None
+player_names = {}  # client -> name chosen with "NAME <name>"; unnamed players are anonymous
+turns_taken = 0
+action_counts = {}
+
+# --- Spectator State ---
+spectators = {}  # conn -> bytearray of unsent output; owned by the fan-out thread
+spectator_events = queue.SimpleQueue()  # Encoded events and (conn, snapshot) for new spectators
+spectator_wake = None  # Write end of the fan-out thread's wake-up pipe
+spectator_sinks = []  # Extra receivers of public events, e.g. the WebSocket gateway
 
 
 """
@@ -29,13 +73,15 @@ Args:
     message (str): The message to broadcast.
 """
 # --- Broadcasting Functions (UPDATED) ---
+@timed()
 def broadcast(message):
-    message += '\n'  # Add newline
+    data = (message + '\n').encode('utf-8')  # Serialize once for everyone
     for client in clients:
         try:
-            client.send(message.encode('utf-8'))
+            client.send(data)
         except:
             clients.remove(client)
+    publish_to_spectators(data)
 
 
 """
@@ -55,14 +101,213 @@ def send_to_client(client, message):
 
 """
 Sends the current hand of a player to their client.
+The encoded message is reused while the hand's cached render is unchanged.
 
 Args:
     player_index (int): The index of the player whose hand is to be sent.
 """
+@timed()
 def send_hand(player_index):
     hand = player_hands[player_index]
-    hand_str = "\n--- Your Hand ---\n" + hand.get_hand_str() + "-----------------\n"
-    send_to_client(clients[player_index], hand_str.strip())
+    hand_str = hand.get_hand_str()
+    cached = hand_messages.get(player_index)
+    if cached is None or cached[0] is not hand_str:
+        message = HAND_HEADER + "\n" + hand_str + HAND_FOOTER + "\n"
+        cached = (hand_str, message.encode('utf-8'))
+        hand_messages[player_index] = cached
+
+    client = clients[player_index]
+    try:
+        client.send(cached[1])
+    except:
+        clients.remove(client)
+
+
+"""
+Hands an already encoded event to the spectator fan-out thread.
+
+The game thread only queues the event once and wakes the fan-out thread, so
+the number of spectators never adds latency to a player's turn.
+
+Args:
+    data (bytes): The encoded event, including the trailing newline.
+"""
+# --- Spectator Fan-out ---
+@timed()
+def publish_to_spectators(data):
+    for sink in spectator_sinks:
+        sink(data)
+    if spectator_wake is None:
+        return
+    spectator_events.put(data)
+    wake_spectator_fan_out()
+
+
+"""
+Wakes the fan-out thread if it is waiting in select().
+"""
+def wake_spectator_fan_out():
+    try:
+        spectator_wake.send(b'\0')
+    except OSError:
+        pass  # The wake-up pipe is already full, so the thread is awake anyway
+
+
+"""
+Builds the public hand-size event (e.g. "HAND_SIZES:7,5,6").
+
+Returns:
+    str: The hand-size event.
+"""
+def hand_sizes_event():
+    return HAND_SIZES + ','.join(str(hand.no_of_cards()) for hand in player_hands)
+
+
+"""
+Stops sending to a spectator and releases its socket.
+
+Args:
+    selector (selectors.BaseSelector): The fan-out thread's selector.
+    conn (socket): The spectator socket.
+"""
+def drop_spectator(selector, conn):
+    selector.unregister(conn)
+    del spectators[conn]
+    try:
+        conn.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+    conn.close()
+
+
+"""
+Sends as much of a spectator's pending output as its socket takes without
+blocking, and waits for the socket to become writable if any is left.
+
+Args:
+    selector (selectors.BaseSelector): The fan-out thread's selector.
+    conn (socket): The spectator socket.
+"""
+def flush_spectator(selector, conn):
+    pending = spectators[conn]
+    try:
+        sent = conn.send(pending)
+    except BlockingIOError:
+        sent = 0
+    except OSError:
+        drop_spectator(selector, conn)
+        return
+    del pending[:sent]
+
+    events = selectors.EVENT_READ | (selectors.EVENT_WRITE if pending else 0)
+    if selector.get_key(conn).events != events:
+        selector.modify(conn, events)
+
+
+"""
+Appends an event to a spectator's pending output. A spectator with more than
+SPECTATOR_BUFFER_LIMIT bytes unsent has fallen too far behind and is dropped.
+
+Args:
+    selector (selectors.BaseSelector): The fan-out thread's selector.
+    conn (socket): The spectator socket.
+    data (bytes): The encoded event.
+"""
+def queue_for_spectator(selector, conn, data):
+    pending = spectators[conn]
+    was_idle = not pending
+    pending += data
+    if len(pending) > SPECTATOR_BUFFER_LIMIT:
+        print("Dropping a spectator that is not keeping up.")
+        drop_spectator(selector, conn)
+    elif was_idle:
+        flush_spectator(selector, conn)
+
+
+"""
+Sends every published event to every spectator from a single thread, using
+non-blocking sockets so a viewer that stops reading only costs its own buffer.
+
+Args:
+    wake_socket (socket): The read end of the wake-up pipe.
+"""
+def spectator_fan_out(wake_socket):
+    selector = selectors.DefaultSelector()
+    selector.register(wake_socket, selectors.EVENT_READ)
+    while True:
+        for key, mask in selector.select():
+            conn = key.fileobj
+            if conn is wake_socket:
+                try:
+                    wake_socket.recv(4096)
+                except BlockingIOError:
+                    pass
+                continue
+
+            if mask & selectors.EVENT_READ:
+                # Spectators never send anything, so readable means closed
+                try:
+                    closed = not conn.recv(1024)
+                except BlockingIOError:
+                    closed = False
+                except OSError:
+                    closed = True
+                if closed:
+                    drop_spectator(selector, conn)
+                    continue
+            if mask & selectors.EVENT_WRITE:
+                flush_spectator(selector, conn)
+
+        while True:
+            try:
+                item = spectator_events.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, tuple):
+                conn, snapshot = item
+                spectators[conn] = bytearray()
+                selector.register(conn, selectors.EVENT_READ)
+                queue_for_spectator(selector, conn, snapshot)
+            else:
+                for conn in list(spectators):
+                    queue_for_spectator(selector, conn, item)
+
+
+"""
+Starts the spectator fan-out thread and its wake-up pipe.
+"""
+def start_spectator_fan_out():
+    global spectator_wake
+    wake_socket, spectator_wake = socket.socketpair()
+    wake_socket.setblocking(False)
+    spectator_wake.setblocking(False)
+    threading.Thread(target=spectator_fan_out, args=(wake_socket,), daemon=True).start()
+
+
+"""
+Accepts spectator connections for the lifetime of the server.
+
+Args:
+    spectator_socket (socket): The listening spectator socket.
+"""
+def accept_spectators(spectator_socket):
+    while True:
+        try:
+            conn, addr = spectator_socket.accept()
+        except OSError:
+            break
+
+        print(f"Spectator connected from {addr}")
+        conn.setblocking(False)
+        snapshot = [b"Welcome, Spectator! You are watching the game.\n"]
+        with game_lock:
+            if game_running and hibernated_path is None and top_card is not None:
+                snapshot.append(f"Top card is now: {top_card}\n".encode('utf-8'))
+                snapshot.append(f"It is Player {turn + 1}'s turn.\n".encode('utf-8'))
+                snapshot.append((hand_sizes_event() + '\n').encode('utf-8'))
+            # Game events are published under game_lock too, so the snapshot can't race them
+            spectator_events.put((conn, b''.join(snapshot)))
+        wake_spectator_fan_out()
 
 
 """
@@ -72,37 +317,111 @@ Args:
     player_index (int): The index of the player to notify.
 """
 # --- NEW: Helper function to start a player's turn (UPDATED) ---
+@timed()
 def notify_player_of_turn(player_index):
-    global top_card
+    global top_card, turns_taken
 
     active_client = clients[player_index]
     active_hand = player_hands[player_index]
 
+    turns_taken += 1
+
     broadcast(f"Top card is now: {top_card}")
     broadcast(f"It is Player {player_index + 1}'s turn.")
+    publish_to_spectators((hand_sizes_event() + '\n').encode('utf-8'))
 
-    send_to_client(active_client, f"TOP_CARD:{top_card}")
+    send_to_client(active_client, TOP_CARD + str(top_card))
     send_hand(player_index)
 
+    if pending_draw:
+        send_to_client(active_client, f"Stack a draw card or 'draw' to take {pending_draw} cards.")
+
     valid_indices = []
     for i, card in enumerate(active_hand.cards):
-        if single_card_check(top_card, card):
+        if rules.can_play(top_card, card, pending_draw):
             valid_indices.append(i + 1)
 
     if valid_indices:
-        send_to_client(active_client, f"VALID_MOVES:{','.join(map(str, valid_indices))}")
+        send_to_client(active_client, VALID_MOVES + ','.join(map(str, valid_indices)))
     else:
-        send_to_client(active_client, "NO_VALID_MOVES")
+        send_to_client(active_client, NO_VALID_MOVES)
 
-    send_to_client(active_client, "YOUR_TURN")
+    send_to_client(active_client, YOUR_TURN)
+
+
+"""
+Asks a player to answer a prompt. Their next message is routed to the
+matching handler in PROMPT_HANDLERS.
+
+Args:
+    player_index (int): The index of the player to ask.
+    prompt (str): The prompt keyword sent to the client (e.g., CHOOSE_COLOR).
+    text (str): The question shown to the player.
+"""
+def prompt_player(player_index, prompt, text):
+    pending_prompts[player_index] = prompt
+    send_to_client(clients[player_index], text)
+    send_to_client(clients[player_index], prompt)
+
+
+"""
+Counts an action taken by a player, for the stored game results.
+
+Args:
+    action (str): The action type (e.g., 'play', 'draw').
+"""
+def count_action(action):
+    action_counts[action] = action_counts.get(action, 0) + 1
+
+
+"""
+Announces the winner, ends the game and queues its result for storage.
+
+Args:
+    player_index (int): The index of the winning player.
+"""
+@timed()
+def end_game(player_index):
+    global game_running
+    broadcast(f"--- GAME OVER ---")
+    broadcast(f"PLAYER {player_index + 1} WINS!")
+    game_running = False
+
+    if results_store is not None:
+        results_store.record_game([player_names.get(client) for client in clients],
+                                  player_index, seed=deck.seed,
+                                  length=turns_taken, actions=action_counts)
+
+
+"""
+Records the name a player's results are stored under. Seats are reused by
+unrelated people, so only players who chose a name get per-player history.
+
+Args:
+    client (socket): The player's client socket.
+    name (str): The chosen name.
+"""
+def set_player_name(client, name):
+    name = name.strip()
+    if not name or len(name) > MAX_NAME_LENGTH:
+        send_to_client(client, f"Names must be 1 to {MAX_NAME_LENGTH} characters.")
+        return
+    if any(taken == name and other is not client for other, taken in player_names.items()):
+        send_to_client(client, f"Another player at this table is already called {name}.")
+        return
+    player_names[client] = name
+    send_to_client(client, f"Your results will be recorded as {name}.")
 
 
 """
 Starts the game by shuffling the deck, dealing cards, and setting the top card.
+Callers must hold game_lock.
 """
 # --- Game Logic Functions ---
 def start_game():
-    global game_running, deck, top_card, turn, player_hands
+    global game_running, deck, top_card, turn, player_hands, rules, last_activity
+    rules = RuleSet(RULE_VARIANT, len(clients))
+    deck = Deck(seed=random.randrange(2 ** 31))
     deck.shuffle()
     player_hands = []
 
@@ -120,95 +439,217 @@ def start_game():
 
     game_running = True
     turn = 0
+    last_activity = time.time()  # Time spent waiting in the lobby doesn't count as idle
     broadcast(f"--- GAME STARTING! ---")
     broadcast(f"All {len(clients)} players have joined.")
+    broadcast(f"Rules: {rules}")
     time.sleep(1)
 
     notify_player_of_turn(turn)
 
 
+"""
+Returns the index of the player after the current one, without moving the turn.
+
+Returns:
+    int: The index of the next player.
+"""
+def peek_next_turn():
+    if reverse_direction:
+        return (turn - 1) % len(clients)
+    return (turn + 1) % len(clients)
+
+
 """
 Determines the next player's turn based on the current game state.
 """
 def get_next_turn():
-    global turn, reverse_direction
-    if reverse_direction:
-        turn = (turn - 1) % len(clients)
+    global turn
+    turn = peek_next_turn()
+
+
+"""
+Deals cards from the deck to a player and sends them their new hand.
+
+Args:
+    player_index (int): The index of the player receiving the cards.
+    count (int): The number of cards to deal.
+"""
+def deal_cards(player_index, count):
+    hand = player_hands[player_index]
+    for _ in range(count):
+        hand.add_card(deck.deal())
+    send_hand(player_index)
+
+
+"""
+Applies a Draw2/Draw4 penalty to the next player. With stacking enabled the
+penalty accumulates and the next player may pass it on; otherwise they draw
+and lose their turn.
+
+Args:
+    amount (int): The number of cards the draw card is worth.
+"""
+def apply_draw_penalty(amount):
+    global pending_draw
+    target_index = peek_next_turn()
+
+    if rules.stack_draws:
+        pending_draw += amount
+        broadcast(f"Player {target_index + 1} must stack or draw {pending_draw} cards!")
+        get_next_turn()
     else:
-        turn = (turn + 1) % len(clients)
+        broadcast(f"Player {target_index + 1} draws {amount} cards!")
+        deal_cards(target_index, amount)
+        get_next_turn()
+        get_next_turn()
+
+
+# --- Card Effects ---
+# Each effect moves the turn on and returns True, or prompts the player and
+# returns False to wait for their answer.
+def effect_advance(player_index, card):
+    get_next_turn()
+    return True
+
+
+def effect_skip(player_index, card):
+    broadcast(f"Player {peek_next_turn() + 1} is skipped!")
+    get_next_turn()
+    get_next_turn()
+    return True
+
+
+def effect_reverse(player_index, card):
+    global reverse_direction
+    reverse_direction = not reverse_direction
+    broadcast("Direction REVERSED!")
+    get_next_turn()
+    return True
+
+
+def effect_draw(player_index, card):
+    apply_draw_penalty(DRAW_AMOUNTS[card.rank])
+    return True
+
+
+def effect_wild(player_index, card):
+    prompt_player(player_index, CHOOSE_COLOR, "What color? (RED, GREEN, BLUE, YELLOW)")
+    return False
+
+
+def effect_swap(player_index, card):
+    prompt_player(player_index, CHOOSE_PLAYER, f"Swap hands with which player? (1-{len(clients)})")
+    return False
+
+
+def effect_rotate(player_index, card):
+    global player_hands
+    step = -1 if reverse_direction else 1
+    player_hands = [player_hands[(i - step) % len(player_hands)] for i in range(len(player_hands))]
+    broadcast("Everyone passes their hand on!")
+    for i in range(len(player_hands)):
+        send_hand(i)
+    get_next_turn()
+    return True
+
+
+CARD_EFFECTS = {
+    'advance': effect_advance,
+    'skip': effect_skip,
+    'reverse': effect_reverse,
+    'draw': effect_draw,
+    'wild': effect_wild,
+    'wild_draw': effect_wild,  # The penalty follows the color choice
+    'swap': effect_swap,
+    'rotate': effect_rotate,
+}
 
 
 """
-Handles a player playing a card, including game logic for special cards.
+Moves a card from a player's hand to the pile and resolves its effect.
+Shared by normal plays, drawn-card plays and jump-ins.
 
 Args:
     player_index (int): The index of the player playing the card.
-    card_index (int): The index of the card being played in the player's hand.
+    card_index (int): The 1-indexed position of the card in their hand.
+    verb (str): How the play is announced (e.g., "played", "jumped in with").
+    action (str): The action type counted for the stored results.
 """
-def play_card(player_index, card_index):
-    global top_card, turn, reverse_direction, game_running
+def resolve_play(player_index, card_index, verb, action):
+    global top_card, draw4_offender
 
     hand = player_hands[player_index]
+    played_card = hand.remove_card(card_index)
 
-    if card_index < 1 or card_index > hand.no_of_cards():
-        send_to_client(clients[player_index], "Invalid index. Try again.")
-        send_to_client(clients[player_index], "YOUR_TURN")
-        return
-
-    played_card = hand.get_card(card_index)
-
-    if not single_card_check(top_card, played_card):
-        send_to_client(clients[player_index], f"Cannot play {played_card}. It doesn't match {top_card}.")
-        send_to_client(clients[player_index], "YOUR_TURN")
-        return
+    if played_card.rank == 'Draw4':
+        # Remember whether the play was legal, in case it is challenged
+        had_match = any(card.color == top_card.color for card in hand.cards)
+        draw4_offender = (player_index, had_match)
 
-    top_card = hand.remove_card(card_index)
-    broadcast(f"Player {player_index + 1} played: {top_card}")
+    top_card = played_card
+    count_action(action)
+    broadcast(f"Player {player_index + 1} {verb}: {top_card}")
 
     if hand.no_of_cards() == 0:
-        broadcast(f"--- GAME OVER ---")
-        broadcast(f"PLAYER {player_index + 1} WINS!")
-        game_running = False
+        end_game(player_index)
         return
 
     if hand.no_of_cards() == 1:
         broadcast(f"Player {player_index + 1} yells UNO!")
 
-    if played_card.cardtype == 'number':
-        get_next_turn()
+    if CARD_EFFECTS[rules.effects[played_card.rank]](player_index, played_card) and game_running:
+        notify_player_of_turn(turn)
 
-    elif played_card.rank == 'Skip':
-        skip_target_index = (turn + 1) % len(clients)
-        if reverse_direction:
-            skip_target_index = (turn - 1) % len(clients)
-        broadcast(f"Player {skip_target_index + 1} is skipped!")
-        get_next_turn()
-        get_next_turn()
 
-    elif played_card.rank == 'Reverse':
-        reverse_direction = not reverse_direction
-        broadcast("Direction REVERSED!")
-        get_next_turn()
+"""
+Handles a player playing a card, including game logic for special cards.
 
-    elif played_card.rank == 'Draw2':
-        draw_target_index = (turn + 1) % len(clients)
-        if reverse_direction:
-            draw_target_index = (turn - 1) % len(clients)
+Args:
+    player_index (int): The index of the player playing the card.
+    card_index (int): The index of the card being played in the player's hand.
+"""
+@timed()
+def play_card(player_index, card_index):
+    hand = player_hands[player_index]
 
-        broadcast(f"Player {draw_target_index + 1} draws 2 cards!")
-        player_hands[draw_target_index].add_card(deck.deal())
-        player_hands[draw_target_index].add_card(deck.deal())
-        send_hand(draw_target_index)
+    if card_index < 1 or card_index > hand.no_of_cards():
+        send_to_client(clients[player_index], "Invalid index. Try again.")
+        send_to_client(clients[player_index], YOUR_TURN)
+        return
 
-        get_next_turn()
-        get_next_turn()
+    played_card = hand.get_card(card_index)
 
-    elif played_card.cardtype == 'action_nocolor':
-        send_to_client(clients[player_index], "CHOOSE_COLOR")
+    if not rules.can_play(top_card, played_card, pending_draw):
+        if pending_draw:
+            send_to_client(clients[player_index], f"Cannot play {played_card}. Stack a draw card or 'draw'.")
+        else:
+            send_to_client(clients[player_index], f"Cannot play {played_card}. It doesn't match {top_card}.")
+        send_to_client(clients[player_index], YOUR_TURN)
         return
 
-    if game_running:
-        notify_player_of_turn(turn)
+    resolve_play(player_index, card_index, "played", 'play')
+
+
+"""
+Handles a player playing an identical card out of turn (jump-in rule).
+
+Args:
+    player_index (int): The index of the player jumping in.
+    card_index (int): The index of the card being played in the player's hand.
+"""
+@timed()
+def jump_in(player_index, card_index):
+    global turn
+    hand = player_hands[player_index]
+
+    if card_index < 1 or card_index > hand.no_of_cards() \
+            or not rules.can_jump_in(top_card, hand.get_card(card_index)):
+        send_to_client(clients[player_index], "It's not your turn. You can only jump in with an identical card.")
+        return
+
+    turn = player_index
+    resolve_play(player_index, card_index, "jumped in with", 'jump_in')
 
 
 """
@@ -218,55 +659,133 @@ Args:
     player_index (int): The index of the player choosing the color.
     color_choice (str): The chosen color.
 """
+@timed()
 def handle_color_choice(player_index, color_choice):
-    global top_card, turn, game_running
-
+    color_choice = color_choice.upper()
     if color_choice not in ('RED', 'GREEN', 'BLUE', 'YELLOW'):
         send_to_client(clients[player_index], "Invalid color. (RED, GREEN, BLUE, YELLOW)")
-        send_to_client(clients[player_index], "CHOOSE_COLOR")
+        prompt_player(player_index, CHOOSE_COLOR, "What color? (RED, GREEN, BLUE, YELLOW)")
         return
 
     top_card.color = color_choice
+    count_action('color')
     broadcast(f"Player {player_index + 1} chose {color_choice}.")
 
-    if top_card.rank == 'Draw4':
-        draw_target_index = (turn + 1) % len(clients)
-        if reverse_direction:
-            draw_target_index = (turn - 1) % len(clients)
+    if rules.effects[top_card.rank] == 'wild_draw':
+        if rules.draw4_challenge and not pending_draw:
+            target_index = peek_next_turn()
+            broadcast(f"Player {target_index + 1} may challenge the Draw4.")
+            prompt_player(target_index, CHALLENGE_CHOICE,
+                          f"Player {player_index + 1} played Draw4. (c)hallenge or (a)ccept?")
+            return
+        apply_draw_penalty(DRAW_AMOUNTS['Draw4'])
+    else:
+        get_next_turn()
+
+    if game_running:
+        notify_player_of_turn(turn)
 
-        broadcast(f"Player {draw_target_index + 1} draws 4 cards!")
-        for _ in range(4):
-            player_hands[draw_target_index].add_card(deck.deal())
-        send_hand(draw_target_index)
 
-        get_next_turn()
-        get_next_turn()
+"""
+Handles a Draw4 target's decision to challenge or accept it. A successful
+challenge makes the offender draw 4; a failed one costs the challenger 6 and
+their turn.
+
+Args:
+    player_index (int): The index of the challenged Draw4's target.
+    choice (str): The player's choice ('c' to challenge, 'a' to accept).
+"""
+@timed()
+def handle_challenge_choice(player_index, choice):
+    choice = choice.lower()
+    offender_index, had_match = draw4_offender
+
+    if choice == 'c':
+        count_action('challenge')
+        if had_match:
+            broadcast(f"Challenge succeeded! Player {offender_index + 1} draws 4 cards instead.")
+            deal_cards(offender_index, DRAW_AMOUNTS['Draw4'])
+            get_next_turn()
+        else:
+            broadcast(f"Challenge failed! Player {player_index + 1} draws 6 cards!")
+            deal_cards(player_index, DRAW_AMOUNTS['Draw4'] + 2)
+            get_next_turn()
+            get_next_turn()
+
+    elif choice == 'a':
+        apply_draw_penalty(DRAW_AMOUNTS['Draw4'])
+
     else:
-        get_next_turn()
+        send_to_client(clients[player_index], "Invalid choice.")
+        prompt_player(player_index, CHALLENGE_CHOICE, "(c)hallenge or (a)ccept?")
+        return
 
     if game_running:
         notify_player_of_turn(turn)
 
 
 """
-Handles a player drawing a card from the deck.
+Handles a player's choice of who to swap hands with after playing a 7.
+
+Args:
+    player_index (int): The index of the player who played the 7.
+    choice (str): The 1-indexed number of the player to swap with.
+"""
+@timed()
+def handle_player_choice(player_index, choice):
+    try:
+        other_index = int(choice) - 1
+    except ValueError:
+        other_index = -1
+
+    if other_index < 0 or other_index >= len(player_hands) or other_index == player_index:
+        send_to_client(clients[player_index], "Invalid player.")
+        prompt_player(player_index, CHOOSE_PLAYER, f"Swap hands with which player? (1-{len(clients)})")
+        return
+
+    player_hands[player_index], player_hands[other_index] = player_hands[other_index], player_hands[player_index]
+    broadcast(f"Player {player_index + 1} swaps hands with Player {other_index + 1}!")
+    send_hand(player_index)
+    send_hand(other_index)
+    get_next_turn()
+
+    if game_running:
+        notify_player_of_turn(turn)
+
+
+"""
+Handles a player drawing a card from the deck. During a draw stack the
+player takes the whole penalty instead and their turn ends.
 
 Args:
     player_index (int): The index of the player drawing the card.
 """
+@timed()
 def player_draws(player_index):
-    global turn, game_running
+    global pending_draw
+
+    if pending_draw:
+        amount = pending_draw
+        pending_draw = 0
+        count_action('draw')
+        broadcast(f"Player {player_index + 1} draws {amount} cards!")
+        deal_cards(player_index, amount)
+        get_next_turn()
+        if game_running:
+            notify_player_of_turn(turn)
+        return
+
     card = deck.deal()
     player_hands[player_index].add_card(card)
+    count_action('draw')
     broadcast(f"Player {player_index + 1} draws a card.")
 
     send_to_client(clients[player_index], f"You drew: {card}")
 
-    if single_card_check(top_card, card):
-        send_to_client(clients[player_index], "You can play this card! (p)lay or (k)eep?")
+    if rules.can_play(top_card, card):
         send_hand(player_index)
-        send_to_client(clients[player_index], f"VALID_MOVES:{player_hands[player_index].no_of_cards()}")
-        send_to_client(clients[player_index], "DRAW_CHOICE")
+        send_to_client(clients[player_index], VALID_MOVES + str(player_hands[player_index].no_of_cards()))
+        prompt_player(player_index, DRAW_CHOICE, "You can play this card! (p)lay or (k)eep?")
     else:
         send_to_client(clients[player_index], "You cannot play this card.")
         get_next_turn()
@@ -282,60 +801,146 @@ Args:
     player_index (int): The index of the player making the decision.
     choice (str): The player's choice ('p' to play, 'k' to keep).
 """
+@timed()
 def handle_draw_choice(player_index, choice):
-    global top_card, turn, reverse_direction, game_running
+    choice = choice.lower()
     hand = player_hands[player_index]
-    drawn_card = hand.get_card(hand.no_of_cards())
 
     if choice == 'p':
-        top_card = hand.remove_card(hand.no_of_cards())
-        broadcast(f"Player {player_index + 1} played the drawn card: {top_card}")
-
-        if hand.no_of_cards() == 0:
-            broadcast(f"--- GAME OVER ---")
-            broadcast(f"PLAYER {player_index + 1} WINS!")
-            game_running = False
-            return
-        if hand.no_of_cards() == 1:
-            broadcast(f"Player {player_index + 1} yells UNO!")
-
-        if drawn_card.rank == 'Skip':
-            skip_target_index = (turn + 1) % len(clients)
-            if reverse_direction:
-                skip_target_index = (turn - 1) % len(clients)
-            broadcast(f"Player {skip_target_index + 1} is skipped!")
-            get_next_turn()
-            get_next_turn()
-        elif drawn_card.rank == 'Reverse':
-            reverse_direction = not reverse_direction
-            broadcast("Direction REVERSED!")
-            get_next_turn()
-        elif drawn_card.rank == 'Draw2':
-            draw_target_index = (turn + 1) % len(clients)
-            if reverse_direction:
-                draw_target_index = (turn - 1) % len(clients)
-            broadcast(f"Player {draw_target_index + 1} draws 2 cards!")
-            player_hands[draw_target_index].add_card(deck.deal())
-            player_hands[draw_target_index].add_card(deck.deal())
-            send_hand(draw_target_index)
-            get_next_turn()
-            get_next_turn()
-        else:  # Number card
-            get_next_turn()
+        resolve_play(player_index, hand.no_of_cards(), "played the drawn card", 'play_drawn')
+        return
 
     elif choice == 'k':
+        count_action('keep')
         broadcast(f"Player {player_index + 1} keeps the card.")
         get_next_turn()
 
     else:
-        send_to_client(clients[player_index], "Invalid choice. (p)lay or (k)eep?")
-        send_to_client(clients[player_index], "DRAW_CHOICE")
+        send_to_client(clients[player_index], "Invalid choice.")
+        prompt_player(player_index, DRAW_CHOICE, "(p)lay or (k)eep?")
         return
 
     if game_running:
         notify_player_of_turn(turn)
 
 
+PROMPT_HANDLERS = {
+    CHOOSE_COLOR: handle_color_choice,
+    DRAW_CHOICE: handle_draw_choice,
+    CHALLENGE_CHOICE: handle_challenge_choice,
+    CHOOSE_PLAYER: handle_player_choice,
+}
+
+
+"""
+Writes the table's cards to disk and frees them, keeping only the blob's path.
+Callers must hold game_lock.
+"""
+# --- Idle Hibernation ---
+def hibernate_game():
+    global deck, player_hands, top_card, hibernated_path
+    blob = pack_game(deck, player_hands, top_card, turn, reverse_direction, pending_draw)
+    path = os.path.join(HIBERNATION_DIR, f"uno-{ROOM_NAME}-{os.getpid()}.hibernated")
+    with open(path, 'wb') as f:
+        f.write(blob)
+
+    deck = None
+    player_hands = None
+    top_card = None
+    hand_messages.clear()
+    hibernated_path = path
+    print(f"Table idle for {HIBERNATE_AFTER}s; hibernated to {path} ({len(blob)} bytes).")
+
+
+"""
+Restores the table from its hibernation blob. Callers must hold game_lock.
+"""
+def wake_game():
+    global deck, player_hands, top_card, turn, reverse_direction, pending_draw, hibernated_path
+    with open(hibernated_path, 'rb') as f:
+        state = unpack_game(f.read())
+    os.remove(hibernated_path)
+    hibernated_path = None
+
+    deck = state['deck']
+    deck.rng.seed(deck.seed + turns_taken)  # Don't replay the opening shuffle's sequence
+    player_hands = state['hands']
+    top_card = state['top_card']
+    turn = state['turn']
+    reverse_direction = state['reverse_direction']
+    pending_draw = state['pending_draw']
+    print("Table woken up.")
+
+
+"""
+Hibernates the table once nobody has sent a command for HIBERNATE_AFTER seconds.
+"""
+def hibernate_idle_table():
+    while True:
+        time.sleep(HIBERNATE_CHECK_INTERVAL)
+        with game_lock:
+            if game_running and hibernated_path is None \
+                    and time.time() - last_activity >= HIBERNATE_AFTER:
+                hibernate_game()
+
+
+"""
+Processes one command from a player: a name for the stored results, an
+answer to a pending prompt, a turn action, or a jump-in. Callers must hold
+game_lock.
+
+Args:
+    player_index (int): The index of the player who sent the command.
+    msg_line (str): The command, without the trailing newline.
+"""
+def handle_command(player_index, msg_line):
+    global last_activity
+    client = clients[player_index]
+
+    last_activity = time.time()
+    if hibernated_path is not None:
+        wake_game()
+
+    if msg_line.startswith('NAME '):
+        set_player_name(client, msg_line[5:])
+        return
+
+    prompt = pending_prompts.pop(player_index, None)
+    if prompt is not None:
+        PROMPT_HANDLERS[prompt](player_index, msg_line)
+        return
+
+    if pending_prompts:
+        send_to_client(client, "Waiting for another player to answer.")
+        return
+
+    if player_index == turn:
+        if msg_line.startswith('play '):
+            try:
+                card_index = int(msg_line.split(' ')[1])
+            except ValueError:
+                send_to_client(client, "Invalid command. Use 'play N' where N is card number.")
+                send_to_client(client, YOUR_TURN)
+                return
+            play_card(player_index, card_index)
+
+        elif msg_line == 'draw':
+            player_draws(player_index)
+
+        else:
+            send_to_client(client, "Invalid command. (e.g., 'play 3' or 'draw')")
+            send_to_client(client, YOUR_TURN)
+
+    elif rules.jump_in and msg_line.startswith('play ') and not pending_draw:
+        try:
+            jump_in(player_index, int(msg_line.split(' ')[1]))
+        except ValueError:
+            send_to_client(client, "Invalid command. Use 'play N' where N is card number.")
+
+    else:
+        send_to_client(client, "It's not your turn.")
+
+
 """
 Handles communication with a single client, processing their actions.
 
@@ -344,64 +949,75 @@ Args:
 """
 # --- Main Client Handler (UPDATED) ---
 def handle_client(client):
-    player_index = clients.index(client)
-    player_state = "PLAYING"
+    player_number = clients.index(client) + 1
+    framer = LineFramer(client)
+    profiling.set_room(ROOM_NAME)
 
     while True:
         try:
-            message = client.recv(1024).decode('utf-8')
-            if not message or not game_running:
+            frames = framer.read_frames()
+            if frames is None:
                 break
 
-            # --- UPDATED: Process all clumped messages ---
-            for msg_line in message.strip().split('\n'):
-                if not msg_line:
-                    continue
+            # --- Process every complete command; partial ones stay buffered ---
+            for msg_line in frames:
+                msg_line = msg_line.strip()
+                if msg_line:
+                    dispatch_command(client, msg_line)
 
-                if player_state == "CHOOSING_COLOR":
-                    handle_color_choice(player_index, msg_line.upper())
-                    player_state = "PLAYING"
-                    continue
+        except Exception as e:
+            print(f"Error with Player {player_number}: {e}")
+            break
 
-                if player_state == "DRAW_CHOICE":
-                    handle_draw_choice(player_index, msg_line.lower())
-                    player_state = "PLAYING"
-                    continue
+    player_disconnected(client)
 
-                if clients.index(client) == turn and player_state == "PLAYING":
 
-                    if msg_line == "CHOOSE_COLOR":
-                        player_state = "CHOOSING_COLOR"
-                        continue
-                    if msg_line == "DRAW_CHOICE":
-                        player_state = "DRAW_CHOICE"
-                        continue
+"""
+Removes a disconnected player and tells the others.
 
-                    if msg_line.startswith('play '):
-                        try:
-                            card_index = int(msg_line.split(' ')[1])
-                            play_card(player_index, card_index)
-                        except:
-                            send_to_client(client, "Invalid command. Use 'play N' where N is card number.")
+Args:
+    client: The player's connection (a socket or a WebSocket player).
+"""
+def player_disconnected(client):
+    with game_lock:
+        if client not in clients:
+            return
+        player_index = clients.index(client)
+        print(f"Player {player_index + 1} disconnected.")
+        clients.remove(client)
+        player_names.pop(client, None)
+        if game_running:
+            broadcast(f"Player {player_index + 1} has left. The game cannot continue.")
 
-                    elif msg_line == 'draw':
-                        player_draws(player_index)
 
-                    else:
-                        send_to_client(client, "Invalid command. (e.g., 'play 3' or 'draw')")
-                        send_to_client(client, "YOUR_TURN")
+"""
+Processes a command from any player connection. Outside a game only NAME is
+accepted; the player keeps their seat either way.
 
-                elif msg_line:
-                    send_to_client(client, "It's not your turn.")
+Args:
+    client: The player's connection (a socket or a WebSocket player).
+    msg_line (str): The command.
+"""
+def dispatch_command(client, msg_line):
+    with game_lock:
+        if msg_line.startswith('NAME ') and client in clients and not game_running:
+            set_player_name(client, msg_line[5:])
+        elif not game_running:
+            send_to_client(client, "The game hasn't started yet.")
+        elif client in clients:
+            handle_command(clients.index(client), msg_line)
 
-        except Exception as e:
-            print(f"Error with Player {player_index + 1}: {e}")
-            break
 
-    print(f"Player {player_index + 1} disconnected.")
-    clients.remove(client)
-    if game_running:
-        broadcast(f"Player {player_index + 1} has left. The game cannot continue.")
+"""
+Processes a command from a player connected through the WebSocket gateway.
+
+Args:
+    client (WebSocketPlayer): The player's connection.
+    msg_line (str): The command.
+"""
+def handle_gateway_command(client, msg_line):
+    profiling.set_room(ROOM_NAME)
+    dispatch_command(client, msg_line)
 
 
 """
@@ -437,16 +1053,75 @@ def wait_for_host_start(server_socket):
         broadcast(f"The host has started the game with {len(clients)} players!")
 
     try:
+        # shutdown() wakes the main thread's accept(); close() alone doesn't on Linux
+        server_socket.shutdown(socket.SHUT_RDWR)
         server_socket.close()
     except Exception as e:
         print(f"Error closing server socket: {e}")
 
 
+"""
+Seats a new connection in the lobby, or turns it away if the game has started
+or the lobby is full. Starts the game automatically when the lobby fills up.
+
+Args:
+    conn: The new connection (a socket or a WebSocket player).
+    addr: The peer address, for logging.
+    lobby_socket (socket): The TCP lobby socket, closed when the lobby fills up.
+
+Returns:
+    bool: True if the connection got a seat.
+"""
+def admit_player(conn, addr, lobby_socket):
+    global game_has_started
+
+    with game_start_lock:
+        if game_has_started:
+            send_to_client(conn, "Sorry, the game has already started.")
+            conn.close()
+            return False
+
+        if len(clients) >= MAX_PLAYERS:
+            send_to_client(conn, "Sorry, the lobby is full.")
+            conn.close()
+            return False
+
+        clients.append(conn)
+        player_num = len(clients)
+
+        print(f"Player {player_num} connected from {addr}")
+        send_to_client(conn, f"Welcome, Player {player_num}!")
+        broadcast(f"Player {player_num} has joined the lobby. ({len(clients)}/{MAX_PLAYERS})")
+
+        if len(clients) == MAX_PLAYERS:
+            print("Max players reached. Starting game automatically...")
+            game_has_started = True
+            broadcast("Max players reached! Starting game automatically...")
+            try:
+                lobby_socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            lobby_socket.close()
+
+    return True
+
+
 """
 Main function to start the server and manage the game lifecycle.
 """
 def main():
-    global game_has_started, game_running
+    global game_has_started, game_running, results_store, RULE_VARIANT, HIBERNATE_AFTER
+    parser = argparse.ArgumentParser(description="UNO game server")
+    parser.add_argument('--variant', default=RULE_VARIANT, choices=list(VARIANTS),
+                        help="The rule variant for this table (default: %(default)s)")
+    parser.add_argument('--hibernate-after', type=float, default=HIBERNATE_AFTER, metavar='SECONDS',
+                        help="Idle time before the table is moved to disk (default: %(default)s)")
+    args = parser.parse_args()
+    RULE_VARIANT = args.variant
+    HIBERNATE_AFTER = args.hibernate_after
+    profiling.set_room(ROOM_NAME)
+    profiling.install_dump_triggers()
+
     server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
     try:
@@ -459,37 +1134,36 @@ def main():
     print(f"--- UNO Server Started ---")
     print(f"Lobby is open on {HOST}:{PORT}")
     print(f"Waiting for at least {MIN_PLAYERS} players (max {MAX_PLAYERS})...")
+    print(f"Rule variant: {RULE_VARIANT}")
+
+    spectator_server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    spectator_server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    try:
+        spectator_server.bind((HOST, SPECTATOR_PORT))
+        spectator_server.listen()
+        start_spectator_fan_out()
+        threading.Thread(target=accept_spectators, args=(spectator_server,), daemon=True).start()
+        print(f"Spectators can watch on {HOST}:{SPECTATOR_PORT}")
+    except Exception as e:
+        print(f"Spectator port {SPECTATOR_PORT} unavailable, spectating disabled. Error: {e}")
 
     host_thread = threading.Thread(target=wait_for_host_start, args=(server,), daemon=True)
     host_thread.start()
 
+    gateway = WebSocketGateway(HOST, WEBSOCKET_PORT,
+                               on_join=lambda conn, addr: admit_player(conn, addr, server),
+                               on_command=handle_gateway_command, on_leave=player_disconnected)
+    try:
+        gateway.start()
+        spectator_sinks.append(gateway.publish)
+        print(f"Browsers can connect to ws://{HOST}:{WEBSOCKET_PORT}/ (spectators: /spectate)")
+    except OSError as e:
+        print(f"WebSocket port {WEBSOCKET_PORT} unavailable, browser play disabled. Error: {e}")
+
     while not game_has_started:
         try:
             conn, addr = server.accept()
-
-            with game_start_lock:
-                if game_has_started:
-                    send_to_client(conn, "Sorry, the game has already started.")
-                    conn.close()
-                    continue
-
-                if len(clients) >= MAX_PLAYERS:
-                    send_to_client(conn, "Sorry, the lobby is full.")
-                    conn.close()
-                    continue
-
-                clients.append(conn)
-                player_num = len(clients)
-
-                print(f"Player {player_num} connected from {addr}")
-                send_to_client(conn, f"Welcome, Player {player_num}!")
-                broadcast(f"Player {player_num} has joined the lobby. ({len(clients)}/{MAX_PLAYERS})")
-
-                if len(clients) == MAX_PLAYERS:
-                    print("Max players reached. Starting game automatically...")
-                    game_has_started = True
-                    broadcast("Max players reached! Starting game automatically...")
-                    server.close()
+            admit_player(conn, addr, server)
 
         except Exception as e:
             if game_has_started:
@@ -504,18 +1178,33 @@ def main():
 
     print(f"\nStarting game with {len(clients)} players.")
 
-    for client in clients:
-        threading.Thread(target=handle_client, args=(client,), daemon=True).start()
+    try:
+        results_store = ResultsStore()
+    except Exception as e:
+        print(f"Game results will not be saved. Error: {e}")
+
+    with game_lock:
+        start_game()
 
-    start_game()
+    # Commands sent from the lobby (e.g. NAME) wait in the socket until now
+    for client in list(clients):
+        if isinstance(client, socket.socket):  # WebSocket players are served by the gateway
+            threading.Thread(target=handle_client, args=(client,), daemon=True).start()
+    threading.Thread(target=hibernate_idle_table, daemon=True).start()
 
     try:
         while game_running:
             time.sleep(1)
     except KeyboardInterrupt:
         print("\nServer shutting down (Ctrl+C)...")
-        broadcast("Server is shutting down.")
-        game_running = False
+        with game_lock:
+            broadcast("Server is shutting down.")
+            game_running = False
+
+    if hibernated_path is not None:
+        os.remove(hibernated_path)
+    if results_store is not None:
+        results_store.close()
 
     print("Game over. Server process finished.")
 
@@ -0,0 +1,259 @@
+# Save this as simulator.py
+import argparse
+import random
+import time
+from game import Deck, Hand, color
+from rules import RuleSet, DRAW_AMOUNTS
+
+MAX_TURNS = 2000  # Games still running after this many turns are abandoned
+
+
+def greedy_policy(game, legal):
+    """
+    Plays a random legal card, or draws when there is none.
+
+    Args:
+        game (SimulatedGame): The game being played.
+        legal (list): The 0-indexed hand positions that can be played.
+
+    Returns:
+        int: The hand position to play, or None to draw.
+    """
+    return game.rng.choice(legal) if legal else None
+
+
+class SimulatedGame:
+    """
+    A headless game between bots, using the same cards and rule tables as the
+    server but no sockets. Draw4 challenges and jump-ins need a human answer
+    or interrupt, so they are not simulated; every other rule option is.
+
+    Attributes:
+        game_id (int): The game's number within a simulation run.
+        seed (int): The seed for the deck and the bots' choices.
+        rules (RuleSet): The compiled rules.
+        hands (list): One Hand per seat.
+        top_card (Card): The current top card on the pile.
+        turn (int): The seat whose turn it is.
+        pending_draw (int): Cards owed by the current seat from stacked draws.
+        turns_taken (int): The number of turns played so far.
+        action_counts (dict): Counts per action type, as stored by ResultsStore.
+    """
+
+    def __init__(self, num_players=4, variant='classic', seed=None, policy=greedy_policy,
+                 recorder=None, game_id=0):
+        self.game_id = game_id
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.rules = RuleSet(variant, num_players)
+        self.policy = policy
+        self.recorder = recorder
+
+        self.deck = Deck(seed=seed, quiet=True)
+        self.deck.shuffle()
+        self.hands = []
+        for _ in range(num_players):
+            hand = Hand()
+            for _ in range(7):
+                hand.add_card(self.deck.deal())
+            self.hands.append(hand)
+
+        self.top_card = self.deck.deal()
+        while self.top_card.cardtype != 'number':
+            self.deck.deck.append(self.top_card)
+            self.deck.shuffle()
+            self.top_card = self.deck.deal()
+
+        self.turn = 0
+        self.reverse_direction = False
+        self.pending_draw = 0
+        self.turns_taken = 0
+        self.action_counts = {}
+        self.effects = {
+            'advance': self._effect_advance,
+            'skip': self._effect_skip,
+            'reverse': self._effect_reverse,
+            'draw': self._effect_draw,
+            'wild': self._effect_wild,
+            'wild_draw': self._effect_wild_draw,
+            'swap': self._effect_swap,
+            'rotate': self._effect_rotate,
+        }
+
+    def _count(self, action):
+        self.action_counts[action] = self.action_counts.get(action, 0) + 1
+
+    def _next_seat(self):
+        step = -1 if self.reverse_direction else 1
+        return (self.turn + step) % len(self.hands)
+
+    def _advance(self, steps=1):
+        for _ in range(steps):
+            self.turn = self._next_seat()
+
+    def _deal(self, seat, count):
+        for _ in range(count):
+            self.hands[seat].add_card(self.deck.deal())
+
+    def _penalty(self, amount):
+        if self.rules.stack_draws:
+            self.pending_draw += amount
+            self._advance()
+        else:
+            self._deal(self._next_seat(), amount)
+            self._advance(2)
+
+    def _choose_color(self):
+        counts = {}
+        for card in self.hands[self.turn].cards:
+            if card.color is not None:
+                counts[card.color] = counts.get(card.color, 0) + 1
+        self.top_card.color = max(counts, key=counts.get) if counts else self.rng.choice(color)
+        self._count('color')
+
+    # --- Card Effects (see server.CARD_EFFECTS) ---
+    def _effect_advance(self):
+        self._advance()
+
+    def _effect_skip(self):
+        self._advance(2)
+
+    def _effect_reverse(self):
+        self.reverse_direction = not self.reverse_direction
+        self._advance()
+
+    def _effect_draw(self):
+        self._penalty(DRAW_AMOUNTS[self.top_card.rank])
+
+    def _effect_wild(self):
+        self._choose_color()
+        self._advance()
+
+    def _effect_wild_draw(self):
+        self._choose_color()
+        self._penalty(DRAW_AMOUNTS['Draw4'])
+
+    def _effect_swap(self):
+        others = [seat for seat in range(len(self.hands)) if seat != self.turn]
+        target = min(others, key=lambda seat: self.hands[seat].no_of_cards())
+        self.hands[self.turn], self.hands[target] = self.hands[target], self.hands[self.turn]
+        self._advance()
+
+    def _effect_rotate(self):
+        step = -1 if self.reverse_direction else 1
+        self.hands = [self.hands[(i - step) % len(self.hands)] for i in range(len(self.hands))]
+        self._advance()
+
+    def _play(self, position):
+        """
+        Plays a card and resolves its effect.
+
+        Returns:
+            bool: True if the card was the player's last one.
+        """
+        hand = self.hands[self.turn]
+        self.top_card = hand.remove_card(position + 1)
+        self._count('play')
+        if hand.no_of_cards() == 0:
+            return True
+        self.effects[self.rules.effects[self.top_card.rank]]()
+        return False
+
+    def run(self, max_turns=MAX_TURNS):
+        """
+        Plays the game to the end.
+
+        Args:
+            max_turns (int): The turn limit before the game is abandoned.
+
+        Returns:
+            int: The winning seat, or None if the game was abandoned.
+        """
+        rules = self.rules
+        while self.turns_taken < max_turns:
+            self.turns_taken += 1
+            seat = self.turn
+            hand = self.hands[seat]
+            legal = [i for i, card in enumerate(hand.cards)
+                     if rules.can_play(self.top_card, card, self.pending_draw)]
+            choice = self.policy(self, legal)
+            if self.recorder is not None:
+                self.recorder.record(self, seat, legal, choice)
+
+            if choice is None:
+                self._count('draw')
+                if self.pending_draw:
+                    self._deal(seat, self.pending_draw)
+                    self.pending_draw = 0
+                    self._advance()
+                    continue
+
+                card = self.deck.deal()
+                hand.add_card(card)
+                if not rules.can_play(self.top_card, card):
+                    self._advance()
+                    continue
+                choice = hand.no_of_cards() - 1  # Always play a playable drawn card
+
+            if self._play(choice):
+                return seat
+
+        return None
+
+
+def simulate(num_games, num_players=4, variant='classic', seed=0, store=None, recorder=None):
+    """
+    Plays many bot games back to back.
+
+    Args:
+        num_games (int): The number of games.
+        num_players (int): The number of seats per game.
+        variant (str): The rule variant (a key of rules.VARIANTS).
+        seed (int): The seed of the first game; game N uses seed + N.
+        store (ResultsStore): Where to record each finished game, if given.
+        recorder: Receives record(game, seat, legal, choice) for every decision
+            and finish_game(game_id, winner) after each game (e.g. a DatasetExporter).
+
+    Returns:
+        int: The number of games that finished with a winner.
+    """
+    players = [f"Bot {seat + 1}" for seat in range(num_players)]
+    finished = 0
+    for game_id in range(num_games):
+        game = SimulatedGame(num_players, variant, seed + game_id, recorder=recorder, game_id=game_id)
+        winner = game.run()
+        if winner is not None:
+            finished += 1
+        if recorder is not None:
+            recorder.finish_game(game_id, winner)
+        if store is not None:
+            store.record_game(players, winner, seed=game.seed,
+                              length=game.turns_taken, actions=game.action_counts)
+    return finished
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play UNO games between bots")
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--players', type=int, default=4)
+    parser.add_argument('--variant', default='classic')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--store', metavar='DB', help="Record results in this SQLite database")
+    args = parser.parse_args()
+
+    store = None
+    if args.store:
+        from results_store import ResultsStore
+        store = ResultsStore(args.store)
+
+    start = time.perf_counter()
+    finished = simulate(args.games, args.players, args.variant, args.seed, store=store)
+    if store is not None:
+        store.close()
+    elapsed = time.perf_counter() - start
+
+    print(f"{finished}/{args.games} games finished in {elapsed:.2f}s ({args.games / elapsed:.0f} games/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,550 @@
+# Save this as websocket_gateway.py
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from protocol import (HAND_HEADER, HAND_FOOTER, TOP_CARD, VALID_MOVES, HAND_SIZES, NO_VALID_MOVES,
+                      YOUR_TURN, PROMPTS)
+
+WS_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+MAX_MESSAGE_SIZE = 1 << 16  # Inbound messages are short commands
+COMPRESS_MIN_SIZE = 128  # Without shared context, smaller events aren't worth deflating
+SPECTATOR_BUFFER_LIMIT = 1 << 20  # Unsent bytes before a slow spectator is dropped
+DEFLATE_TAIL = b'\x00\x00\xff\xff'
+
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+
+# --- WebSocket Framing (RFC 6455) ---
+def apply_mask(payload, mask):
+    """
+    XORs a payload with a 4-byte mask (masking and unmasking are the same).
+
+    Args:
+        payload (bytes): The payload.
+        mask (bytes): The 4-byte mask.
+
+    Returns:
+        bytes: The masked payload.
+    """
+    length = len(payload)
+    key = (mask * (length // 4 + 1))[:length]
+    return (int.from_bytes(payload, 'little') ^ int.from_bytes(key, 'little')).to_bytes(length, 'little')
+
+
+def encode_frame(opcode, payload, compressed=False, mask=None):
+    """
+    Builds a single, final WebSocket frame.
+
+    Args:
+        opcode (int): The frame opcode (e.g., OP_TEXT).
+        payload (bytes): The payload.
+        compressed (bool): Whether the payload is permessage-deflate compressed (sets RSV1).
+        mask (bytes): A 4-byte mask; clients must mask, servers must not.
+
+    Returns:
+        bytes: The frame.
+    """
+    first = 0x80 | (0x40 if compressed else 0) | opcode
+    mask_bit = 0x80 if mask else 0
+    length = len(payload)
+    if length < 126:
+        header = struct.pack('!BB', first, mask_bit | length)
+    elif length < 65536:
+        header = struct.pack('!BBH', first, mask_bit | 126, length)
+    else:
+        header = struct.pack('!BBQ', first, mask_bit | 127, length)
+
+    if mask:
+        return header + mask + apply_mask(payload, mask)
+    return header + payload
+
+
+async def read_frame(reader):
+    """
+    Reads one frame.
+
+    Args:
+        reader (asyncio.StreamReader): The connection.
+
+    Returns:
+        tuple: (fin, compressed, opcode, payload).
+    """
+    first, second = await reader.readexactly(2)
+    length = second & 0x7F
+    if length == 126:
+        (length,) = struct.unpack('!H', await reader.readexactly(2))
+    elif length == 127:
+        (length,) = struct.unpack('!Q', await reader.readexactly(8))
+    if length > MAX_MESSAGE_SIZE:
+        raise ValueError(f"Frame of {length} bytes is too large")
+
+    mask = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(length)
+    if mask:
+        payload = apply_mask(payload, mask)
+    return bool(first & 0x80), bool(first & 0x40), first & 0x0F, payload
+
+
+async def read_messages(reader, writer, decompressor):
+    """
+    Yields complete data messages, answering pings and closes along the way.
+
+    Args:
+        reader (asyncio.StreamReader): The connection.
+        writer (asyncio.StreamWriter): The connection, for control replies.
+        decompressor: A raw zlib decompressor if permessage-deflate is on, else None.
+
+    Yields:
+        bytes: Each message's payload, decompressed.
+    """
+    parts = []
+    compressed = False
+    while True:
+        fin, rsv1, opcode, payload = await read_frame(reader)
+
+        if opcode == OP_CLOSE:
+            writer.write(encode_frame(OP_CLOSE, payload[:2]))
+            return
+        if opcode == OP_PING:
+            writer.write(encode_frame(OP_PONG, payload))
+            continue
+        if opcode == OP_PONG:
+            continue
+
+        if opcode != OP_CONTINUATION:
+            parts = []
+            compressed = rsv1
+        parts.append(payload)
+        if not fin:
+            if sum(len(part) for part in parts) > MAX_MESSAGE_SIZE:
+                raise ValueError("Message is too large")
+            continue
+
+        message = b''.join(parts)
+        if compressed and decompressor is not None:
+            message = decompressor.decompress(message + DEFLATE_TAIL, MAX_MESSAGE_SIZE)
+        yield message
+
+
+def compress_message(compressor, payload):
+    """
+    Compresses one message for permessage-deflate.
+
+    Args:
+        compressor: A raw zlib compressor (wbits=-15).
+        payload (bytes): The message.
+
+    Returns:
+        bytes: The compressed message, without the trailing empty block.
+    """
+    return (compressor.compress(payload) + compressor.flush(zlib.Z_SYNC_FLUSH))[:-len(DEFLATE_TAIL)]
+
+
+def negotiate_deflate(extensions_header):
+    """
+    Picks the first permessage-deflate offer in a client's
+    Sec-WebSocket-Extensions that this server can honor (full 15-bit window).
+
+    Args:
+        extensions_header (str): The header value, possibly empty.
+
+    Returns:
+        tuple: (deflate enabled, whether the client asked for
+            server_no_context_takeover).
+    """
+    for offer in extensions_header.split(','):
+        params = [param.strip() for param in offer.split(';')]
+        if params[0] != 'permessage-deflate':
+            continue
+        if not any(param.startswith('server_max_window_bits=') and param != 'server_max_window_bits=15'
+                   for param in params[1:]):
+            return True, 'server_no_context_takeover' in params[1:]
+    return False, False
+
+
+async def server_handshake(reader, writer, spectator_path):
+    """
+    Performs the HTTP upgrade.
+
+    Args:
+        reader (asyncio.StreamReader): The connection.
+        writer (asyncio.StreamWriter): The connection.
+        spectator_path (str): The request path that makes a spectator.
+
+    Returns:
+        tuple: (path, deflate enabled, server_no_context_takeover), or None
+            if the request was rejected.
+    """
+    try:
+        request = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1')
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+        return None
+
+    request_line, *header_lines = request.split('\r\n')
+    headers = {}
+    for line in header_lines:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+
+    parts = request_line.split(' ')
+    key = headers.get('sec-websocket-key')
+    if len(parts) != 3 or parts[0] != 'GET' or headers.get('upgrade', '').lower() != 'websocket' or not key:
+        writer.write(b"HTTP/1.1 400 Bad Request\r\nConnection: close\r\n\r\n")
+        return None
+
+    path = parts[1]
+    accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode('latin-1')).digest()).decode('ascii')
+    deflate, no_context_takeover = negotiate_deflate(headers.get('sec-websocket-extensions', ''))
+    # Spectators share one compressed frame per event, so no context is kept between messages
+    no_context_takeover = deflate and (no_context_takeover or path == spectator_path)
+
+    response = ["HTTP/1.1 101 Switching Protocols", "Upgrade: websocket", "Connection: Upgrade",
+                f"Sec-WebSocket-Accept: {accept}"]
+    if deflate:
+        response.append("Sec-WebSocket-Extensions: permessage-deflate"
+                        + ("; server_no_context_takeover" if no_context_takeover else ""))
+    writer.write(('\r\n'.join(response) + '\r\n\r\n').encode('latin-1'))
+    return path, deflate, no_context_takeover
+
+
+# --- Game Events ---
+class EventTranslator:
+    """
+    Turns the line protocol sent to TCP clients into JSON events for browsers.
+    A multi-line hand block becomes a single "hand" event.
+    """
+
+    def __init__(self):
+        self._hand = None
+
+    def translate(self, data):
+        """
+        Args:
+            data (bytes): One or more protocol lines, as passed to socket.send.
+
+        Returns:
+            list: The JSON-encoded events.
+        """
+        events = []
+        for line in data.decode('utf-8').split('\n'):
+            msg = line.strip()
+            if self._hand is not None:
+                if msg == HAND_FOOTER:
+                    events.append({'type': 'hand', 'cards': self._hand})
+                    self._hand = None
+                elif msg:
+                    self._hand.append(msg.split('.', 1)[1] if '.' in msg else msg)
+                continue
+            if not msg:
+                continue
+
+            if msg == HAND_HEADER:
+                self._hand = []
+            elif msg.startswith(TOP_CARD):
+                events.append({'type': 'top_card', 'card': msg.split(':', 1)[1]})
+            elif msg.startswith(VALID_MOVES):
+                moves = msg.split(':', 1)[1]
+                events.append({'type': 'valid_moves', 'moves': [int(x) for x in moves.split(',') if x]})
+            elif msg == NO_VALID_MOVES:
+                events.append({'type': 'valid_moves', 'moves': []})
+            elif msg.startswith(HAND_SIZES):
+                events.append({'type': 'hand_sizes', 'sizes': [int(x) for x in msg.split(':', 1)[1].split(',') if x]})
+            elif msg == YOUR_TURN:
+                events.append({'type': 'your_turn'})
+            elif msg in PROMPTS:
+                events.append({'type': 'prompt', 'prompt': msg})
+            else:
+                events.append({'type': 'message', 'text': msg})
+
+        return [json.dumps(event, separators=(',', ':')) for event in events]
+
+
+def parse_commands(message):
+    """
+    Reads commands from a browser message: plain lines ("play 3") or JSON
+    ({"command": "play 3"}).
+
+    Args:
+        message (bytes): The message payload.
+
+    Returns:
+        list: The command lines.
+    """
+    text = message.decode('utf-8', errors='replace').strip()
+    if text.startswith('{'):
+        try:
+            text = str(json.loads(text).get('command', ''))
+        except (ValueError, AttributeError):
+            return []
+    return [line.strip() for line in text.split('\n') if line.strip()]
+
+
+class WebSocketPlayer:
+    """
+    A browser player. Looks like a client socket to the game (send/sendall/
+    close from any thread); writes happen on the gateway's event loop.
+
+    Attributes:
+        closed (bool): Whether the connection has closed.
+    """
+
+    def __init__(self, loop, writer, deflate, no_context_takeover=False):
+        self.loop = loop
+        self.writer = writer
+        self.closed = False
+        self._deflate = deflate
+        self._no_context_takeover = no_context_takeover
+        self._compressor = zlib.compressobj(wbits=-15) if deflate else None
+        self._translator = EventTranslator()
+
+    def send(self, data):
+        if self.closed:
+            raise OSError("WebSocket connection is closed")
+        self.loop.call_soon_threadsafe(self._write_events, data)
+        return len(data)
+
+    sendall = send
+
+    def close(self):
+        self.closed = True
+        self.loop.call_soon_threadsafe(self._close)
+
+    def _write_events(self, data):
+        if self.writer.is_closing():
+            return
+        for event in self._translator.translate(data):
+            payload = event.encode('utf-8')
+            if self._deflate and not self._no_context_takeover:
+                # The shared context makes even short, repetitive events compress well
+                self.writer.write(encode_frame(OP_TEXT, compress_message(self._compressor, payload), True))
+            elif self._deflate and len(payload) >= COMPRESS_MIN_SIZE:
+                # A fresh compressor per message when the client won't keep our context
+                compressed = compress_message(zlib.compressobj(wbits=-15), payload)
+                self.writer.write(encode_frame(OP_TEXT, compressed, True))
+            else:
+                self.writer.write(encode_frame(OP_TEXT, payload))
+
+    def _close(self):
+        if not self.writer.is_closing():
+            self.writer.write(encode_frame(OP_CLOSE, struct.pack('!H', 1000)))
+            self.writer.close()
+
+
+# --- Gateway ---
+class WebSocketGateway:
+    """
+    Serves browsers over WebSocket on its own event loop thread, next to the
+    TCP listeners. Players ("/") join the same table as TCP clients through
+    the server's callbacks; spectators ("/spectate") get the public events,
+    each encoded (and compressed) once for all of them.
+
+    Attributes:
+        host (str): The address to listen on.
+        port (int): The port to listen on.
+    """
+
+    def __init__(self, host, port, on_join, on_command, on_leave, spectator_path='/spectate'):
+        """
+        Args:
+            host (str): The address to listen on.
+            port (int): The port to listen on.
+            on_join: Called as on_join(player, addr) from a worker thread; returns
+                True if the player got a seat.
+            on_command: Called as on_command(player, line) for each command, in order.
+            on_leave: Called as on_leave(player) when a seated player disconnects.
+            spectator_path (str): The request path for spectators.
+        """
+        self.host = host
+        self.port = port
+        self.on_join = on_join
+        self.on_command = on_command
+        self.on_leave = on_leave
+        self.spectator_path = spectator_path
+        self.loop = None
+        self._spectators = {}  # writer -> whether it negotiated permessage-deflate
+        self._spectator_translator = EventTranslator()
+
+    def start(self):
+        """
+        Starts the gateway thread and waits until it is listening.
+
+        Raises:
+            OSError: If the port can't be bound.
+        """
+        ready = threading.Event()
+        failure = []
+
+        def run():
+            self.loop = asyncio.new_event_loop()
+            try:
+                server = self.loop.run_until_complete(
+                    asyncio.start_server(self._handle, self.host, self.port, backlog=4096))
+            except OSError as e:
+                failure.append(e)
+                ready.set()
+                return
+            ready.set()
+            try:
+                self.loop.run_forever()
+            finally:
+                server.close()
+
+        threading.Thread(target=run, daemon=True).start()
+        ready.wait()
+        if failure:
+            raise failure[0]
+
+    def publish(self, data):
+        """
+        Sends public events to every WebSocket spectator. Safe to call from any thread.
+
+        Args:
+            data (bytes): One or more encoded protocol lines.
+        """
+        if self._spectators:
+            self.loop.call_soon_threadsafe(self._fan_out, data)
+
+    def _fan_out(self, data):
+        for event in self._spectator_translator.translate(data):
+            payload = event.encode('utf-8')
+            plain = encode_frame(OP_TEXT, payload)
+            deflated = None
+            if len(payload) >= COMPRESS_MIN_SIZE:
+                deflated = encode_frame(OP_TEXT, compress_message(zlib.compressobj(wbits=-15), payload), True)
+
+            for writer, deflate in list(self._spectators.items()):
+                if writer.transport.get_write_buffer_size() > SPECTATOR_BUFFER_LIMIT:
+                    # close() would wait to flush to a peer that isn't reading
+                    del self._spectators[writer]
+                    writer.transport.abort()
+                    continue
+                writer.write(deflated if deflate and deflated is not None else plain)
+
+    async def _handle(self, reader, writer):
+        try:
+            handshake = await server_handshake(reader, writer, self.spectator_path)
+            if handshake is None:
+                return
+            path, deflate, no_context_takeover = handshake
+            decompressor = zlib.decompressobj(wbits=-15) if deflate else None
+
+            if path == self.spectator_path:
+                await self._serve_spectator(reader, writer, deflate, decompressor)
+            else:
+                await self._serve_player(reader, writer, deflate, no_context_takeover, decompressor)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError, zlib.error):
+            pass
+        finally:
+            self._spectators.pop(writer, None)
+            writer.close()
+
+    async def _serve_spectator(self, reader, writer, deflate, decompressor):
+        self._spectators[writer] = deflate
+        writer.write(encode_frame(OP_TEXT, json.dumps(
+            {'type': 'message', 'text': "Welcome, Spectator! You are watching the game."}).encode('utf-8')))
+        async for _ in read_messages(reader, writer, decompressor):
+            pass  # Spectators can't send commands
+
+    async def _serve_player(self, reader, writer, deflate, no_context_takeover, decompressor):
+        player = WebSocketPlayer(self.loop, writer, deflate, no_context_takeover)
+        peer = writer.get_extra_info('peername')
+        if not await self.loop.run_in_executor(None, self.on_join, player, peer):
+            player.closed = True
+            await writer.drain()
+            return
+
+        try:
+            async for message in read_messages(reader, writer, decompressor):
+                for line in parse_commands(message):
+                    await self.loop.run_in_executor(None, self.on_command, player, line)
+        finally:
+            player.closed = True
+            await self.loop.run_in_executor(None, self.on_leave, player)
+
+
+# --- Load Testing ---
+async def _load_test_client(host, port, path, deflate, stats, stop_at):
+    reader, writer = await asyncio.open_connection(host, port)
+    key = base64.b64encode(os.urandom(16)).decode('ascii')
+    request = [f"GET {path} HTTP/1.1", f"Host: {host}:{port}", "Upgrade: websocket",
+               "Connection: Upgrade", f"Sec-WebSocket-Key: {key}", "Sec-WebSocket-Version: 13"]
+    if deflate:
+        request.append("Sec-WebSocket-Extensions: permessage-deflate")
+    writer.write(('\r\n'.join(request) + '\r\n\r\n').encode('latin-1'))
+
+    response = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1')
+    if not response.startswith("HTTP/1.1 101"):
+        raise ConnectionError(response.split('\r\n', 1)[0])
+    stats['connected'] += 1
+    decompressor = zlib.decompressobj(wbits=-15) if 'permessage-deflate' in response else None
+
+    try:
+        while time.monotonic() < stop_at:
+            _, compressed, opcode, payload = await asyncio.wait_for(
+                read_frame(reader), max(stop_at - time.monotonic(), 0.01))
+            if opcode == OP_CLOSE:
+                break
+            stats['messages'] += 1
+            stats['bytes'] += len(payload)
+            if compressed and decompressor is not None:
+                decompressor.decompress(payload + DEFLATE_TAIL)
+    except asyncio.TimeoutError:
+        pass
+    except (asyncio.IncompleteReadError, ConnectionError):
+        stats['closed'] += 1  # The server hung up (e.g. at game over), which is not a failure
+    finally:
+        writer.write(encode_frame(OP_CLOSE, struct.pack('!H', 1000), mask=os.urandom(4)))
+        writer.close()
+
+
+async def load_test(host, port, count, path='/spectate', seconds=10.0, deflate=True):
+    """
+    Opens many WebSocket connections to a running gateway and counts what they receive.
+
+    Args:
+        host (str): The gateway address.
+        port (int): The gateway port.
+        count (int): The number of connections.
+        path (str): The path to connect to ("/spectate" for spectators).
+        seconds (float): How long to stay connected.
+        deflate (bool): Whether to offer permessage-deflate.
+
+    Returns:
+        dict: connected, failed (connection or handshake errors), closed (hung up
+            by the server before the time was up), messages and bytes (payload
+            bytes on the wire).
+    """
+    stats = {'connected': 0, 'failed': 0, 'closed': 0, 'messages': 0, 'bytes': 0}
+    stop_at = time.monotonic() + seconds
+    results = await asyncio.gather(
+        *(_load_test_client(host, port, path, deflate, stats, stop_at) for _ in range(count)),
+        return_exceptions=True)
+    stats['failed'] = sum(isinstance(result, Exception) for result in results)
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test a running UNO WebSocket gateway")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5557)
+    parser.add_argument('--connections', type=int, default=1000)
+    parser.add_argument('--path', default='/spectate')
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--no-deflate', action='store_true')
+    args = parser.parse_args()
+
+    print(asyncio.run(load_test(args.host, args.port, args.connections, args.path,
+                                args.seconds, not args.no_deflate)))